@@ -0,0 +1,94 @@
+# Pipeline_Support/CleaningScheduler.py
+import os
+import pickle
+import pyarrow as pa
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .ETL_SupportFunctions import dedupe_rows, coerce_table
+from .RowValidation import scrub_rows, print_scrub_report
+from .DerivationRules import apply_derivations
+from .Imputation import impute_table, print_impute_report
+
+
+# Shipping a small table to a worker costs more than cleaning it in place
+INLINE_BELOW_ROWS = 50000
+
+
+def _pack(df):
+    """Serialize a frame for a worker as an Arrow IPC stream (pickle for columns Arrow cannot type)."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return 'pickle', pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return 'arrow', sink.getvalue()
+
+
+def _unpack(payload):
+    kind, data = payload
+    if kind == 'pickle':
+        return pickle.loads(data)
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+def _clean(name, df, strategies=None):
+    """
+    One table after the cross-table derivations, in the order of the serial path (fill_mv, then
+    correct_dtypes): impute, then scrub header/garbage rows, drop duplicates and coerce types.
+    Coercion zero-fills some numeric columns, so it must not run before imputation.
+    """
+    imputed = {}
+    if df.isna().any().any():
+        df, imputed = impute_table(name, df, strategies)
+    df, counts = scrub_rows(df, name)
+    df, removed = dedupe_rows(df)
+    return coerce_table(name, df), {'impute': imputed, 'scrub': counts, 'duplicates': removed}
+
+
+def _run_remote(name, payload, strategies):
+    df, report = _clean(name, _unpack(payload), strategies)
+    return _pack(df), report
+
+
+def _report(name, report):
+    print_impute_report(name, report['impute'])
+    print_scrub_report(name, report['scrub'])
+    if report['duplicates']:
+        print(f"🧹 Removed {report['duplicates']} duplicate rows from '{name}'")
+
+
+def clean_tables(dataframes, max_workers=None, strategies=None, inline_below_rows=INLINE_BELOW_ROWS):
+    """
+    Clean all tables with the per-table work spread over a process pool, with the same result as
+    the serial fill_mv + correct_dtypes:
+    - the cross-table derivations (commission / sale / rent) run first, in this process;
+    - then every table is imputed, scrubbed, deduplicated and type-coerced independently.
+    Frames travel to and from workers as Arrow IPC buffers; tables under inline_below_rows
+    rows are cleaned in this process. Returns the dataframes dict.
+    """
+    apply_derivations(dataframes)
+    remote = any(len(df) >= inline_below_rows for df in dataframes.values() if df is not None)
+    pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) if remote else None
+    futures = {}
+    try:
+        for name, df in dataframes.items():
+            if df is None:
+                continue
+            if pool is None or len(df) < inline_below_rows:
+                future = Future()
+                future.set_result(_clean(name, df, strategies))
+                futures[future] = (name, True)
+            else:
+                futures[pool.submit(_run_remote, name, _pack(df), strategies)] = (name, False)
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, inline = futures.pop(future)
+                df, report = future.result()
+                dataframes[name] = df if inline else _unpack(df)
+                _report(name, report)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return dataframes
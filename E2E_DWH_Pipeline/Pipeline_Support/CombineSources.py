@@ -1,13 +1,85 @@
+import numpy as np
 import pandas as pd
+from .SourceSchemas import PRIMARY_KEYS
 
 
-def combine_parts(csv_df: pd.DataFrame = None, db_df: pd.DataFrame = None, mock_df: pd.DataFrame = None) -> pd.DataFrame:
+# When two sources hold different versions of the same primary key, the earlier source wins.
+# The OLTP database is the system of record, then the CSV exports, then Mockaroo rows.
+SOURCE_PRECEDENCE = ('db', 'csv', 'mock')
+
+
+def _key_hashes(df: pd.DataFrame, keys: list) -> np.ndarray:
+    """Hash the key columns so 5, 5.0 and '5' from different sources collide as they should."""
+    normalized = {}
+    for k in keys:
+        s = df[k]
+        numeric = pd.to_numeric(s, errors='coerce')
+        if numeric.notna().sum() == s.notna().sum():
+            normalized[k] = numeric.astype('float64')
+        else:
+            normalized[k] = s.astype(str).str.strip()
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized, index=df.index), index=False).to_numpy()
+
+
+def merge_sources(table: str, parts, precedence=SOURCE_PRECEDENCE, keys: list = None) -> pd.DataFrame:
+    """Merge the source versions of one logical table on its primary key.
+
+    - parts is an iterable of (source_name, DataFrame) pairs and is consumed one part at a time,
+      so a generator lets each source frame be released as soon as it has been merged.
+    - Rows are deduplicated on a hash of the key columns only; for a key present in several
+      sources the row from the source listed first in precedence is kept (unknown sources rank last).
+    - Rows with a missing key cannot be matched and are kept (exact duplicates among them are dropped).
+    - Tables without a known key fall back to exact-row deduplication.
+    """
+    keys = keys if keys is not None else PRIMARY_KEYS.get(table.lower())
+    rank_of = {name: i for i, name in enumerate(precedence)}
+    kept = []  # [rank, frame, key hashes]
+    keyless = []
+    for name, df in parts:
+        if df is None or df.empty:
+            continue
+        df = df.loc[:, ~df.columns.duplicated()]
+        if not keys or not all(k in df.columns for k in keys):
+            keyless.append(df)
+            continue
+        missing_key = df[keys].isna().any(axis=1).to_numpy()
+        if missing_key.any():
+            keyless.append(df[missing_key])
+            df = df[~missing_key]
+        hashes = _key_hashes(df, keys)
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        df, hashes = df[first], hashes[first]
+        rank = rank_of.get(name, len(precedence))
+        for entry in kept:
+            if entry[0] <= rank:
+                new = ~np.isin(hashes, entry[2])
+                df, hashes = df[new], hashes[new]
+            else:
+                old = ~np.isin(entry[2], hashes)
+                entry[1], entry[2] = entry[1][old], entry[2][old]
+        kept.append([rank, df, hashes])
+
+    pieces = [entry[1] for entry in kept]
+    if keyless:
+        pieces.append(pd.concat(keyless, ignore_index=True, sort=False).drop_duplicates())
+    pieces = [p for p in pieces if not p.empty]
+    if not pieces:
+        return pd.DataFrame()
+    return pd.concat(pieces, ignore_index=True, sort=False)
+
+
+def combine_parts(csv_df: pd.DataFrame = None, db_df: pd.DataFrame = None, mock_df: pd.DataFrame = None,
+                  table: str = None, precedence=SOURCE_PRECEDENCE) -> pd.DataFrame:
     """Combine up to three dataframe parts for the same logical table.
 
     - Accepts None for any missing part.
     - Concatenates with sort=False to preserve union of columns.
-    - Drops exact duplicate rows and resets index.
+    - With table given (and its primary key known from the DDL) rows are merged on the key
+      via merge_sources; otherwise exact duplicate rows are dropped.
     """
+    if table is not None:
+        return merge_sources(table, [('csv', csv_df), ('db', db_df), ('mock', mock_df)], precedence=precedence)
+
     parts = []
     if csv_df is not None and not csv_df.empty:
         parts.append(csv_df)
@@ -0,0 +1,170 @@
+# Pipeline_Support/DataScaler.py
+import os
+import zlib
+import numpy as np
+import pandas as pd
+from .SourceSchemas import PRIMARY_KEYS, FOREIGN_KEYS
+from .FactAssembly import key_index
+
+
+BASE_DIR = os.path.dirname(__file__)
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), 'Database', 'Datasets')
+SCALE_CHUNK_ROWS = 500_000
+
+# Measures that get a little multiplicative noise in the copies, so scaled data is not made of exact
+# duplicates (KNN, clustering and dedup behave differently on those); everything else is copied as is
+JITTER_COLUMNS = {
+    'property': ['asking_amount'],
+    'sale': ['sale_amount'],
+    'rent': ['rent_amount'],
+    'commission': ['commission_amount'],
+    'maintenance': ['cost'],
+    'features': ['lot_area_sqft', 'parking_area_sqft'],
+}
+JITTER = 0.05
+
+
+def scaled_rows(n, factor):
+    return int(round(n * factor))
+
+
+def scale_factor_for(datasets, rows, table='sale'):
+    """The factor that gives `table` (about) `rows` rows, e.g. scale_factor_for(d, 10_000_000)."""
+    return rows / len(datasets[table])
+
+
+def _numeric_keys(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _key_span(df, table):
+    """Offset between two copies of a table's keys: its largest primary key."""
+    pk = PRIMARY_KEYS.get(table, [None])[0]
+    if pk not in df.columns:
+        return 0
+    keys = _numeric_keys(df[pk])
+    return int(np.nanmax(keys)) if np.isfinite(keys).any() else 0
+
+
+def _shift_keys(values, offset):
+    """Add offset to the numeric keys; stray text (e.g. repeated header rows) is kept as it was."""
+    num = _numeric_keys(values)
+    shifted = pd.Series(num + offset, index=values.index)
+    stray = np.isnan(num) & values.notna().to_numpy()
+    if stray.any():
+        return shifted.astype(object).where(~stray, values)
+    return shifted.astype('Int64')
+
+
+def _unit_noise(row_ids, salt):
+    # deterministic uniform [0, 1) per output row, independent of how the rows are chunked
+    h = pd.util.hash_array(row_ids.astype('int64') ^ np.int64(salt), categorize=False)
+    return (h >> np.uint64(11)).astype('float64') / float(1 << 53)
+
+
+def _jitter(values, row_ids, replica, salt, amount):
+    num = pd.to_numeric(values, errors='coerce')
+    noise = 1 + amount * (2 * _unit_noise(row_ids, salt) - 1)
+    noise[replica == 0] = 1.0  # the first copy is the source itself
+    jittered = num * noise
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return jittered.round().astype(values.dtype)
+    return jittered.where(num.notna(), values) if values.dtype == object else jittered
+
+
+def scale_table(datasets, table, factor, start=0, stop=None, jitter=JITTER, seed=0):
+    """
+    Rows [start, stop) of `table` scaled by `factor`. Output row i is a copy of source row i % n in
+    copy r = i // n: its primary key moves up by r x the largest source key, and each foreign key
+    (from the DDL) is pointed at the same copy of the referenced row, or an earlier copy when the
+    referenced table's last copy is partial, so every reference stays valid. Missing values are
+    copied with their rows, so null rates stay those of the source.
+    """
+    src = datasets[table].reset_index(drop=True)
+    n = len(src)
+    total = scaled_rows(n, factor)
+    stop = total if stop is None else min(stop, total)
+    row_ids = np.arange(start, stop)
+    if n == 0 or not len(row_ids):
+        return src.head(0)
+    pos, replica = row_ids % n, row_ids // n
+    out = src.take(pos).reset_index(drop=True)
+
+    pk = PRIMARY_KEYS.get(table, [None])[0]
+    if pk in out.columns:
+        out[pk] = _shift_keys(out[pk], replica * _key_span(src, table))
+
+    for col, (ref_table, ref_col) in FOREIGN_KEYS.get(table, {}).items():
+        if col not in out.columns or ref_table not in datasets:
+            continue
+        ref = datasets[ref_table]
+        ref_n = len(ref)
+        ref_total = scaled_rows(ref_n, factor)
+        full, rem = divmod(ref_total, ref_n) if ref_n else (0, 0)
+        index, rows = key_index(_numeric_keys(ref[ref_col]))
+        ref_pos = index.get_indexer(_numeric_keys(out[col]))
+        ref_pos = np.where(ref_pos >= 0, rows[np.maximum(ref_pos, 0)], -1)
+        # copies of the referenced row that exist in the scaled table
+        copies = np.where(ref_pos >= 0, full + (ref_pos < rem), 1)
+        target = replica % np.maximum(copies, 1)
+        if full == 0 and rem:
+            # down-scaling: references to rows that were cut go to a kept row instead
+            cut = (ref_pos >= rem)
+            kept = _numeric_keys(ref[ref_col].iloc[:rem])
+            out.loc[cut, col] = kept[row_ids[cut] % rem]
+        out[col] = _shift_keys(out[col], target * _key_span(ref, ref_table))
+
+    if jitter:
+        for col in JITTER_COLUMNS.get(table, []):
+            if col in out.columns:
+                salt = zlib.crc32(f'{seed}.{table}.{col}'.encode('utf-8'))
+                out[col] = _jitter(out[col], row_ids, replica, salt, jitter)
+    return out
+
+
+def iter_scaled_table(datasets, table, factor, chunk_rows=SCALE_CHUNK_ROWS, **kwargs):
+    """scale_table in chunks of chunk_rows output rows (memory stays at one chunk)."""
+    total = scaled_rows(len(datasets[table]), factor)
+    for start in range(0, total, chunk_rows):
+        yield scale_table(datasets, table, factor, start, start + chunk_rows, **kwargs)
+
+
+def scale_datasets(datasets, factor, **kwargs):
+    """Every table scaled by the same factor, in memory: {table: DataFrame}."""
+    return {table: scale_table(datasets, table, factor, **kwargs) for table in datasets}
+
+
+def write_scaled_datasets(out_dir, factor, datasets=None, chunk_rows=SCALE_CHUNK_ROWS, **kwargs):
+    """
+    Write the scaled tables as <table>.csv under out_dir, chunk by chunk, so tens of millions of
+    rows never need to fit in memory. The folder can be used as etl_master's base_url.
+    datasets defaults to the CSVs in Database/Datasets.
+    """
+    if datasets is None:
+        from .ETL_SupportFunctions import fetch_datasets
+        from .ETL_MasterFunction import SOURCE_TABLES
+        datasets = fetch_datasets(SOURCE_TABLES, DATASETS_DIR, cache=False)
+    os.makedirs(out_dir, exist_ok=True)
+    for table in datasets:
+        path = os.path.join(out_dir, f'{table}.csv')
+        rows = 0
+        for i, chunk in enumerate(iter_scaled_table(datasets, table, factor, chunk_rows, **kwargs)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows += len(chunk)
+        print(f"📈 Scaled {table}: {len(datasets[table])} -> {rows} rows")
+    return out_dir
+
+
+def check_foreign_keys(datasets):
+    """Count references that point at no row, per DDL foreign key: {'table.column': dangling count}."""
+    report = {}
+    for table, refs in FOREIGN_KEYS.items():
+        if table not in datasets:
+            continue
+        for col, (ref_table, ref_col) in refs.items():
+            if col not in datasets[table].columns or ref_table not in datasets:
+                continue
+            values = pd.Series(_numeric_keys(datasets[table][col]))
+            known = pd.Series(_numeric_keys(datasets[ref_table][ref_col]))
+            report[f'{table}.{col}'] = int((values.notna() & ~values.isin(known)).sum())
+    return report
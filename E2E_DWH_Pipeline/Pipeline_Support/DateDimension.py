@@ -0,0 +1,80 @@
+# Pipeline_Support/DateDimension.py
+import numpy as np
+import pandas as pd
+from .Staging import read_staged, staged_exists
+
+
+DATE_DIM_COLUMNS = ['DateID', 'Date', 'Year', 'Quarter', 'Month', 'Week', 'Day']
+
+
+def build_calendar(start_date, end_date, first_id=1):
+    """Calendar rows for every day in [start_date, end_date], DateIDs numbered from first_id."""
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    return pd.DataFrame({
+        'DateID': np.arange(first_id, first_id + len(dates)),
+        'Date': dates,
+        'Year': dates.year,
+        'Quarter': dates.quarter,
+        'Month': dates.month,
+        # week of the year counted from Jan 1st (days 1-7 are week 1), as the original apply did
+        'Week': (dates.dayofyear - 1) // 7 + 1,
+        'Day': dates.day,
+    })
+
+
+def load_date_dim(staging_dir=None):
+    """The Dim_Date staged by the last run, or None on a first run."""
+    if not staged_exists('Dim_Date', staging_dir=staging_dir):
+        return None
+    return read_staged('Dim_Date', staging_dir=staging_dir)
+
+
+def ensure_date_dim(existing=None, dates=None, start_date=None, end_date=None):
+    """
+    Return a Dim_Date covering [start_date, end_date] and every date in `dates`.
+    Rows already in `existing` keep their DateIDs; missing days are appended with new ids
+    (after the current maximum), so fact rows loaded earlier still point at the same dates.
+    Ranges taken from `dates` are widened to whole calendar years.
+    """
+    bounds = [pd.Timestamp(d) for d in (start_date, end_date) if d is not None]
+    if dates is not None:
+        d = pd.to_datetime(pd.Series(dates), errors='coerce').dropna()
+        if len(d):
+            bounds += [pd.Timestamp(d.min().year, 1, 1), pd.Timestamp(d.max().year, 12, 31)]
+    if existing is not None and len(existing):
+        existing = existing[DATE_DIM_COLUMNS].sort_values('DateID').reset_index(drop=True)
+        bounds += [existing['Date'].min(), existing['Date'].max()]
+    if not bounds:
+        raise ValueError("ensure_date_dim needs a date range, dates or an existing Dim_Date")
+
+    wanted = build_calendar(min(bounds).normalize(), max(bounds).normalize())
+    if existing is None or not len(existing):
+        return wanted
+    new = wanted[~wanted['Date'].isin(existing['Date'])]
+    if new.empty:
+        return existing
+    new = new.assign(DateID=np.arange(len(new)) + int(existing['DateID'].max()) + 1)
+    print(f"📅 Dim_Date: extended by {len(new)} days ({new['Date'].min().date()} .. {new['Date'].max().date()})")
+    return pd.concat([existing, new.astype(existing.dtypes.to_dict())], ignore_index=True)
+
+
+def date_id_lookup(dim_date):
+    """
+    Build an O(1) date -> DateID lookup: an array indexed by days since the first calendar date.
+    The returned function maps a datetime Series/array to a nullable Int32 array
+    (missing where the date is NaT or outside the calendar).
+    """
+    origin = dim_date['Date'].min().normalize()
+    offsets = ((dim_date['Date'].dt.normalize() - origin) // pd.Timedelta(days=1)).to_numpy()
+    table = np.zeros(int(offsets.max()) + 1 if len(offsets) else 0, dtype='int64')
+    table[offsets] = dim_date['DateID'].to_numpy()
+
+    def lookup(dates):
+        d = pd.to_datetime(pd.Series(dates), errors='coerce').dt.normalize()
+        pos = ((d - origin) // pd.Timedelta(days=1)).to_numpy(dtype='float64', na_value=np.nan)
+        ok = ~np.isnan(pos) & (pos >= 0) & (pos < len(table))
+        ids = np.zeros(len(pos), dtype='int64')
+        ids[ok] = table[pos[ok].astype('int64')]
+        return pd.arrays.IntegerArray(ids.astype('int32'), ~ok | (ids == 0))
+
+    return lookup
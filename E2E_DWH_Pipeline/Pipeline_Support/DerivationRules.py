@@ -0,0 +1,102 @@
+# Pipeline_Support/DerivationRules.py
+import numpy as np
+import pandas as pd
+
+
+def _numeric(values):
+    return pd.to_numeric(pd.Series(values), errors='coerce').astype('float64').to_numpy()
+
+
+def _keys(df, key):
+    # ids arrive as int, Int32, float or text depending on the source; compare them as floats
+    return _numeric(df[key]) if key in df.columns else np.full(len(df), np.nan)
+
+
+def _lookup(df, key, col, keys):
+    """
+    Value of `col` from the first row of df whose `key` equals each of `keys` (NaN when absent),
+    plus a mask of which keys were found at all. One hash join instead of a scan per key.
+    """
+    if df is None or key not in df.columns:
+        return np.full(len(keys), np.nan), np.zeros(len(keys), dtype=bool)
+    table = pd.DataFrame({'k': _keys(df, key),
+                          'v': _numeric(df[col]) if col in df.columns else np.nan})
+    table = table.dropna(subset=['k']).drop_duplicates('k')
+    pos = pd.Index(table['k']).get_indexer(keys)
+    found = pos >= 0
+    values = np.full(len(keys), np.nan)
+    values[found] = table['v'].to_numpy()[pos[found]]
+    return values, found
+
+
+def _commission_base(dataframes, cids):
+    """Transaction amount a commission was charged on: the sale when one references it, else the rent."""
+    sale_amt, in_sale = _lookup(dataframes.get('sale'), 'commission_id', 'sale_amount', cids)
+    rent_amt, in_rent = _lookup(dataframes.get('rent'), 'commission_id', 'rent_amount', cids)
+    return np.where(in_sale, sale_amt, np.where(in_rent, rent_amt, np.nan))
+
+
+def derive_commission_rate(dataframes):
+    comm = dataframes['commission']
+    base = _commission_base(dataframes, _keys(comm, 'commission_id'))
+    amount = _numeric(comm['commission_amount']) if 'commission_amount' in comm.columns else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base != 0, amount / base * 100, np.nan)
+
+
+def derive_commission_amount(dataframes):
+    comm = dataframes['commission']
+    base = _commission_base(dataframes, _keys(comm, 'commission_id'))
+    rate = _numeric(comm['commission_rate']) if 'commission_rate' in comm.columns else np.nan
+    return base * rate / 100.0
+
+
+def _amount_from_commission(dataframes, table):
+    df, comm = dataframes[table], dataframes.get('commission')
+    cids = _keys(df, 'commission_id')
+    amount, _ = _lookup(comm, 'commission_id', 'commission_amount', cids)
+    rate, _ = _lookup(comm, 'commission_id', 'commission_rate', cids)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate != 0, amount / (rate / 100.0), np.nan)
+
+
+def derive_rent_amount(dataframes):
+    return _amount_from_commission(dataframes, 'rent')
+
+
+def derive_sale_amount(dataframes):
+    return _amount_from_commission(dataframes, 'sale')
+
+
+# (table, column, rule) applied in order; later rules see values filled by earlier ones
+DERIVATION_RULES = [
+    ('commission', 'commission_rate', derive_commission_rate),
+    ('commission', 'commission_amount', derive_commission_amount),
+    ('rent', 'rent_amount', derive_rent_amount),
+    ('sale', 'sale_amount', derive_sale_amount),
+]
+
+
+def apply_derivations(dataframes, rules=None, verbose=True):
+    """
+    Fill missing values that follow from other tables (commission = amount x rate / 100).
+    Each rule returns a derived value for every row of its table; only missing cells are filled.
+    Returns {'table.column': number of values filled} (verbose=False skips the per-rule messages).
+    """
+    report = {}
+    for table, column, rule in (rules if rules is not None else DERIVATION_RULES):
+        df = dataframes.get(table)
+        if df is None or column not in df.columns:
+            continue
+        missing = df[column].isna().to_numpy()
+        filled = 0
+        if missing.any():
+            derived = rule(dataframes)
+            fill = missing & ~np.isnan(derived)
+            filled = int(fill.sum())
+            if filled:
+                df.loc[fill, column] = derived[fill]
+        report[f'{table}.{column}'] = filled
+        if filled and verbose:
+            print(f"🔧 Derived {filled} missing {column} values in '{table}'")
+    return report
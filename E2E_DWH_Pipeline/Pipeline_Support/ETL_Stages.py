@@ -0,0 +1,160 @@
+# Pipeline_Support/ETL_Stages.py
+from sqlalchemy import create_engine
+from .ETL_SupportFunctions import (
+    fill_mv, correct_dtypes, build_date_dim, create_loc_dim, create_agent_dim,
+    create_propdet_dim, create_listing_dim, tidy_star_dims
+)
+from .ETL_MasterFunction import SOURCE_TABLES, ingest_sources
+from .CleaningScheduler import clean_tables
+from .FactAssembly import assemble_fact_trans
+from .DateDimension import load_date_dim
+from .KeyRegistry import load_key_registry, save_key_registry
+from .ArtifactSink import artifact_sink, WAREHOUSE_URL, DIM_SNAPSHOT_DIR, FACT_SNAPSHOT_DIR
+from .PipelineDAG import Stage, run_dag
+
+
+STAR_TABLES = ['Dim_Date', 'Dim_Location', 'Dim_Agent', 'Dim_PropertyDetails', 'Dim_Listing', 'Fact_Transaction']
+
+
+def _engine():
+    return create_engine(WAREHOUSE_URL)
+
+
+# ---------- stage functions (inputs are never modified in place: they may be cached or shared) ----------
+
+def ingest_stage(source, db_params, use_mockaroo, base_url):
+    raw = ingest_sources(SOURCE_TABLES, source=source, db_params=db_params, use_mockaroo=use_mockaroo, base_url=base_url)
+    # raw extracts are staged in the background, like in etl_master; export_stage's flush waits for them
+    sink = artifact_sink()
+    for name, df in raw.items():
+        if df is not None:
+            sink.publish(f'raw/{name}', df, to=('parquet',))
+    return raw
+
+
+def clean_stage(raw, parallel_clean):
+    dataframes = {t: df.copy() for t, df in raw.items()}
+    if parallel_clean:
+        return clean_tables(dataframes)
+    return correct_dtypes(fill_mv(dataframes))
+
+
+def state_stage(key_store):
+    """What earlier runs left behind: the key registry and the staged Dim_Date."""
+    key_engine = _engine() if key_store == "warehouse" else None
+    return load_key_registry(engine=key_engine), load_date_dim()
+
+
+def dim_date_stage(tables, prev_dim_date, start_date, end_date):
+    return build_date_dim(tables['sale'], tables['rent'], start_date=start_date, end_date=end_date, dim_date=prev_dim_date)
+
+
+def _with_keys(builder, dimension, key_registry, **frames):
+    # each builder extends its own copy of the registry; save_keys_stage merges the slices
+    keys = dict(key_registry)
+    dim = builder(keys=keys, **frames)
+    return dim, keys.get(dimension)
+
+
+def dim_location_stage(tables, key_registry):
+    return _with_keys(create_loc_dim, 'Dim_Location', key_registry, address=tables['address'])
+
+
+def dim_agent_stage(tables, key_registry):
+    return _with_keys(create_agent_dim, 'Dim_Agent', key_registry, agent=tables['agent'])
+
+
+def dim_propdet_stage(tables):
+    return create_propdet_dim(features=tables['features'])
+
+
+def dim_listing_stage(tables, key_registry):
+    return _with_keys(create_listing_dim, 'Dim_Listing', key_registry, property=tables['property'], visit=tables['visit'])
+
+
+def fact_stage(tables, dim_date, dim_location, dim_agent, dim_propdet, dim_listing, start_date, end_date, load_mode):
+    # merged facts are matched on TransactionID, so they get the stable ids derived from sale_id / rent_id
+    return assemble_fact_trans(sale=tables['sale'], rent=tables['rent'], maintenance=tables['maintenance'],
+                               property=tables['property'], commission=tables['commission'], visit=tables['visit'],
+                               start_date=start_date, end_date=end_date, dimdate=dim_date, dimloc=dim_location,
+                               dimagent=dim_agent, dimprodet=dim_propdet, dimlisting=dim_listing,
+                               transaction_ids='source' if load_mode == 'merge' else 'sequence')
+
+
+def star_stage(dim_date, dim_location, dim_agent, dim_propdet, dim_listing, fact):
+    dims = tidy_star_dims(dim_date, dim_location, dim_agent, dim_propdet, dim_listing)
+    return dict(zip(STAR_TABLES, dims + (fact,)))
+
+
+def export_stage(star, export_csv):
+    # through the run's artifact sink (set up by etl_dag): unchanged tables are not rewritten
+    sink = artifact_sink()
+    for name, df in star.items():
+        sink.publish(name, df, to=('parquet', 'csv'))
+    sink.flush(('parquet', 'csv'))
+    print("✅ Star schema staged" + (" and CSVs saved." if export_csv else "."))
+    return True
+
+
+def load_stage(star):
+    print("⬆️ Loading tables into PostgreSQL database...")
+    sink = artifact_sink()
+    for name, df in star.items():
+        sink.publish(name, df, to=('postgres',))
+    sink.flush(('postgres',))
+    print("✅ Data successfully loaded into PostgreSQL!")
+    return True
+
+
+def save_keys_stage(key_registry, keys_location, keys_agent, keys_listing, loaded, key_store):
+    # only record new surrogate keys once the tables that use them are loaded
+    registry = dict(key_registry)
+    for dim, keys in (('Dim_Location', keys_location), ('Dim_Agent', keys_agent), ('Dim_Listing', keys_listing)):
+        if keys is not None:
+            registry[dim] = keys
+    save_key_registry(registry, engine=_engine() if key_store == "warehouse" else None)
+
+
+ETL_STAGES = [
+    Stage('ingest', ingest_stage, outputs=('raw',), params=('source', 'db_params', 'use_mockaroo', 'base_url'), cacheable=False),
+    Stage('clean', clean_stage, inputs=('raw',), outputs=('tables',), params=('parallel_clean',)),
+    Stage('state', state_stage, outputs=('key_registry', 'prev_dim_date'), params=('key_store',), cacheable=False),
+    Stage('dim_date', dim_date_stage, inputs=('tables', 'prev_dim_date'), outputs=('dim_date',), params=('start_date', 'end_date')),
+    Stage('dim_location', dim_location_stage, inputs=('tables', 'key_registry'), outputs=('dim_location', 'keys_location')),
+    Stage('dim_agent', dim_agent_stage, inputs=('tables', 'key_registry'), outputs=('dim_agent', 'keys_agent')),
+    Stage('dim_propdet', dim_propdet_stage, inputs=('tables',), outputs=('dim_propdet',)),
+    Stage('dim_listing', dim_listing_stage, inputs=('tables', 'key_registry'), outputs=('dim_listing', 'keys_listing')),
+    Stage('fact', fact_stage, inputs=('tables', 'dim_date', 'dim_location', 'dim_agent', 'dim_propdet', 'dim_listing'),
+          outputs=('fact',), params=('start_date', 'end_date', 'load_mode')),
+    Stage('star', star_stage, inputs=('dim_date', 'dim_location', 'dim_agent', 'dim_propdet', 'dim_listing', 'fact'),
+          outputs=('star',)),
+    Stage('export', export_stage, inputs=('star',), outputs=('staged',), params=('export_csv',), cacheable=False),
+    Stage('load', load_stage, inputs=('star',), outputs=('loaded',), cacheable=False),
+    Stage('save_keys', save_keys_stage, inputs=('key_registry', 'keys_location', 'keys_agent', 'keys_listing', 'loaded'),
+          params=('key_store',), cacheable=False),
+]
+
+
+def etl_dag(source="hybrid", db_params=None, use_mockaroo=True, base_url=None, export_csv=True,
+            parallel_clean=False, start_date='2022-01-01', end_date='2025-12-31', key_store="file",
+            load_mode="replace", targets=None, only=None, resume=False, max_workers=4):
+    """
+    etl_master as a DAG of stages (see PipelineDAG.run_dag): ingest -> clean -> the five dimensions
+    (concurrently) -> fact -> star -> Parquet/CSV export alongside the warehouse load.
+    Cleaning and star-schema stages are reused from the cache when the extracted data, the parameters
+    and the code are unchanged, so re-running in the notebook only redoes what changed.
+    load_mode: "replace" or "merge" (upsert that skips unchanged rows, see WarehouseLoader.py).
+    targets / only / resume: run part of the pipeline, a single stage, or continue after a failure.
+    Full refreshes only; incremental and partitioned-fact runs go through etl_master.
+    Returns the star schema tables like etl_master (None for ones not built by a partial run).
+    """
+    params = dict(source=source, db_params=db_params, use_mockaroo=use_mockaroo, base_url=base_url,
+                  export_csv=export_csv, parallel_clean=parallel_clean, start_date=start_date,
+                  end_date=end_date, key_store=key_store, load_mode=load_mode)
+    sink = artifact_sink(engine=_engine(), csv=export_csv, load_mode=load_mode, dim_dir=DIM_SNAPSHOT_DIR,
+                         fact_dir=FACT_SNAPSHOT_DIR, new_run=True)
+    artifacts = run_dag(ETL_STAGES, params, targets=targets, only=only, resume=resume, max_workers=max_workers)
+    # partial runs may stop before export_stage: wait for what ingest staged
+    sink.flush()
+    star = artifacts.get('star', {})
+    return tuple(star.get(name) for name in STAR_TABLES)
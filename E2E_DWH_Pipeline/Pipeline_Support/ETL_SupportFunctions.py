@@ -1,48 +1,177 @@
 # Pipeline_Support/ETL_SupportFunctions.py
+import os
+import time
 import pandas as pd
 import numpy as np
 import requests
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 from sklearn.impute import KNNImputer
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 import warnings
+from .PostgresExtract import get_engine, read_table, DEFAULT_CHUNKSIZE
+from .SourceSchemas import read_csv_typed, read_options, SCHEMA_VERSION
+from .ExtractCache import cache_entry, cache_load, cache_store, touch_entry, content_fingerprint
+from .RowValidation import scrub_tables
+from .DerivationRules import apply_derivations
+from .Imputation import impute_tables
+from .DateDimension import build_calendar, ensure_date_dim, date_id_lookup
+from .KeyRegistry import assign_surrogate_keys
+from .FactAssembly import assemble_fact_trans
 
 
 
-def fetch_from_postgres(table_names, db_name, user, password, host="localhost", port=5432):
+def _pg_fingerprint(conn, table):
+    """
+    Change marker for a Postgres table: the server's current WAL position (the replay position on a
+    standby), taken before the table is read. Every committed write moves it, so an unchanged marker
+    means nothing can have changed since the cached extract; a write to any other table only costs
+    a re-read. Constant time, unlike a COUNT(*), and not subject to the asynchronous (and resettable)
+    pg_stat counters.
+    """
+    lsn = conn.execute(text("SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() "
+                            "ELSE pg_current_wal_lsn() END")).scalar()
+    return f"lsn={lsn};schema={SCHEMA_VERSION}"
+
+def fetch_from_postgres(table_names, db_name, user, password, host="localhost", port=5432, cache=True,
+                        chunksize=DEFAULT_CHUNKSIZE, method="auto", since=None):
     """
     Fetch data directly from PostgreSQL tables into pandas DataFrames.
+    Uses the shared pooled engine and the COPY / server-side cursor extractor from PostgresExtract.py
+    (method and chunksize are passed through to stream_table).
+    since: optional {table: (column, value[, operator])}; those tables only return rows with
+    column > value (or the operator given; incremental extraction, see Watermarks.since_filters).
+    Delta reads bypass the cache.
+    With cache=True a table whose fingerprint (see _pg_fingerprint) is unchanged is loaded
+    from the local extract cache instead of being re-read.
     Returns dict with lowercase keys (table_name -> df).
     """
-    engine = create_engine(f"postgresql://{user}:{password}@{host}:{port}/{db_name}")
+    engine = get_engine(db_name=db_name, user=user, password=password, host=host, port=port)
+    source = f"postgres://{host}:{port}/{db_name}"
     dataframes = {}
+    since = since or {}
     for table in table_names:
-        query = f'SELECT * FROM "{table}"'
-        df = pd.read_sql(query, engine)
+        fingerprint = None
+        df = None
+        delta = since.get(table.lower())
+        if delta is not None:
+            dataframes[table.lower()] = read_table(engine, table, chunksize=chunksize, method=method, since=delta,
+                                                   **read_options(table))
+            print(f"🔖 {table}: {len(dataframes[table.lower()])} rows with {delta[0]} {delta[2] if len(delta) > 2 else '>'} {delta[1]}")
+            continue
+        if cache:
+            with engine.connect() as conn:
+                fingerprint = _pg_fingerprint(conn, table)
+            df = cache_load(source, table, fingerprint)
+        if df is None:
+            df = read_table(engine, table, chunksize=chunksize, method=method, **read_options(table))
+            if cache:
+                cache_store(source, table, df, fingerprint)
+        else:
+            print(f"📦 {table}: unchanged in PostgreSQL, loaded from cache")
         dataframes[table.lower()] = df
     return dataframes
 
 # Data Ingestion (web/csv)
-def fetch_datasets(csv_files, base_url):
+def _local_csv_dir(base_url):
+    """
+    Return the local directory behind base_url when it is a directory path or a file:// url, else None.
+    """
+    if base_url.startswith('file://'):
+        return url2pathname(urlparse(base_url).path)
+    if os.path.isdir(base_url):
+        return base_url
+    return None
+
+def _fetch_csv(file, base_url, local_dir, timeout, cache=True, cache_max_age=None):
+    """
+    Fetch and parse a single CSV table. Returns (df, seconds taken, where it came from).
+    Columns are typed while parsing from the DDL-derived registry (SourceSchemas.py).
+    With cache=True unchanged tables are served from the extract cache: local files are keyed
+    by mtime/size, remote files by ETag/Last-Modified (or a content hash), revalidated on every call.
+    cache_max_age (seconds, opt-in) serves remote entries younger than that without touching the
+    network at all, at the risk of missing a change made in that window.
+    """
+    start = time.perf_counter()
+    if local_dir is not None:
+        path = os.path.join(local_dir, file + '.csv')
+        source = os.path.abspath(local_dir)
+        stat = os.stat(path)
+        fingerprint = f"{stat.st_mtime_ns}-{stat.st_size}-{SCHEMA_VERSION}"
+        df = cache_load(source, file, fingerprint) if cache else None
+        if df is not None:
+            return df, time.perf_counter() - start, 'cache'
+        df = read_csv_typed(path, file)
+        if cache:
+            cache_store(source, file, df, fingerprint)
+        return df, time.perf_counter() - start, 'disk'
+
+    csv_url = base_url.rstrip('/') + '/' + file + '.csv'
+    entry = cache_entry(base_url, file) if cache else None
+    if entry is not None and cache_max_age and time.time() - entry['fetched_at'] < cache_max_age:
+        df = cache_load(base_url, file)
+        if df is not None:
+            return df, time.perf_counter() - start, 'cache'
+
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    response = requests.get(csv_url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        df = cache_load(base_url, file)
+        if df is not None:
+            touch_entry(base_url, file)
+            return df, time.perf_counter() - start, 'cache (304)'
+        response = requests.get(csv_url, timeout=timeout)
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch {file}.csv from {csv_url} (status {response.status_code})")
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    fingerprint = f"{etag or content_fingerprint(response.content)}-{SCHEMA_VERSION}"
+    df = cache_load(base_url, file, fingerprint) if cache else None
+    if df is not None:
+        touch_entry(base_url, file)
+        return df, time.perf_counter() - start, 'cache'
+    df = read_csv_typed(StringIO(response.text), file)
+    if cache:
+        cache_store(base_url, file, df, fingerprint, etag=etag, last_modified=last_modified)
+    return df, time.perf_counter() - start, 'network'
+
+def fetch_datasets(csv_files, base_url, max_workers=8, timeout=60, timings=None, cache=True, cache_max_age=None):
     """
-    Fetch CSV files from base_url (raw csv urls). Returns dict with lowercase keys.
+    Fetch CSV files from base_url (raw csv urls, a local directory or a file:// url).
+    Tables are fetched and parsed concurrently on a pool of at most max_workers threads
+    (max_workers=1 keeps the old one-by-one behaviour).
+    Unchanged tables come from the local extract cache (see ExtractCache.py) unless cache=False;
+    remote files are revalidated every time unless cache_max_age (seconds) is given.
+    Per-table latency is printed and, if a dict is passed as timings, stored there (table -> seconds).
+    Returns dict with lowercase keys.
     """
+    local_dir = _local_csv_dir(base_url)
+    workers = max(1, min(max_workers or 1, len(csv_files) or 1))
     dataframes = {}
-    for file in csv_files:
-        csv_url = base_url.rstrip('/') + '/' + file + '.csv'
-        response = requests.get(csv_url)
-        if response.status_code == 200:
-            df = pd.read_csv(StringIO(response.text))
-            
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {file: pool.submit(_fetch_csv, file, base_url, local_dir, timeout, cache, cache_max_age)
+                   for file in csv_files}
+        # collect in the requested order so the returned dict looks the same as before
+        for file, future in futures.items():
+            df, elapsed, origin = future.result()
             dataframes[file.lower()] = df
-        else:
-            raise Exception(f"Failed to fetch {file}.csv from {csv_url} (status {response.status_code})")
+            if timings is not None:
+                timings[file.lower()] = elapsed
+            print(f"⏱️ {file}: {len(df)} rows in {elapsed:.2f}s ({origin})")
     return dataframes
 
-# helper: safe numeric conversion
+# helper: safe numeric conversion (columns typed at read time skip the parse)
 def to_numeric_safe(series, fillna=0, as_int=False):
-    s = pd.to_numeric(series, errors='coerce')
+    s = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
     if fillna is not None:
         s = s.fillna(fillna)
     if as_int:
@@ -50,122 +179,139 @@ def to_numeric_safe(series, fillna=0, as_int=False):
         s = s.round().astype(int)
     return s
 
-# DB Data Type Correction
-def correct_dtypes(dataframes):
-    """
-    Convert commonly used columns to the correct pandas dtypes.
-    Expects dataframes keys in lowercase: 'address','client','agent',...
-    """
-    # ---- CLEAN DUPLICATE HEADERS OR INVALID ROWS ----
-    for df_name, df in list(dataframes.items()):
-        # remove rows that are probably duplicated header rows (all values equal to column names)
-        mask = df.apply(lambda row: all(str(v).strip().lower() in map(str.lower, df.columns) for v in row), axis=1)
-        df_clean = df[~mask].reset_index(drop=True)
-        
-        # ---- REMOVE TRUE DUPLICATE ROWS (same values across all columns) ----
-        before = len(df_clean)
-        df_clean = df_clean.drop_duplicates(keep='first').reset_index(drop=True)
-        after = len(df_clean)
-        dataframes[df_name] = df_clean
-
-        if before != after:
-            print(f"🧹 Removed {before - after} duplicate rows from '{df_name}'")
-
-    date_columns = ['agent_dob', 'client_dob', 'owner_dob', 'hire_date',
-                    'listing_date', 'maintenance_date', 'visit_date',
-                    'sale_date', 'agreement_date', 'rent_start_date',
-                    'rent_end_date', 'payment_date']
+# helper: parse dates once; columns already typed by the schema registry are returned as-is
+def _as_datetime(series, **kwargs):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce', **kwargs)
 
-    for name, df in dataframes.items():
-        for col in df.columns:
-            if col.lower() in [d.lower() for d in date_columns]:
-                df[col] = pd.to_datetime(df[col], format='%m/%d/%Y', errors='coerce')
+# Per-table cleaning steps (used by correct_dtypes and, in worker processes, by CleaningScheduler)
+DATE_COLUMNS = ['agent_dob', 'client_dob', 'owner_dob', 'hire_date',
+                'listing_date', 'maintenance_date', 'visit_date',
+                'sale_date', 'agreement_date', 'rent_start_date',
+                'rent_end_date', 'payment_date']
+
+
+def dedupe_rows(df):
+    """Remove true duplicate rows (same values across all columns). Returns (df, rows removed)."""
+    if df.empty:
+        return df, 0
+    before = len(df)
+    df = df.drop_duplicates(keep='first').reset_index(drop=True)
+    return df, before - len(df)
+
+
+def coerce_table(name, df):
+    """Convert one table's commonly used columns to the correct pandas dtypes."""
+    for col in df.columns:
+        if col.lower() in DATE_COLUMNS:
+            df[col] = _as_datetime(df[col], format='mixed')
 
     # Address
-    if 'address' in dataframes:
-        dataframes['address']['zip_code'] = to_numeric_safe(dataframes['address'].get('zip_code', pd.Series()), fillna=0, as_int=True).astype(str)
+    if name == 'address':
+        df['zip_code'] = to_numeric_safe(df.get('zip_code', pd.Series()), fillna=0, as_int=True).astype(str)
 
     # Client
-    if 'client' in dataframes:
-        dataframes['client']['client_dob'] = pd.to_datetime(dataframes['client'].get('client_dob'), errors='coerce', dayfirst=False)
+    elif name == 'client':
+        df['client_dob'] = _as_datetime(df.get('client_dob'), dayfirst=False)
 
     # Agent
-    if 'agent' in dataframes:
-        dataframes['agent']['agent_dob'] = pd.to_datetime(dataframes['agent'].get('agent_dob'), errors='coerce', dayfirst=False)
-        dataframes['agent']['hire_date'] = pd.to_datetime(dataframes['agent'].get('hire_date'), errors='coerce', dayfirst=False)
+    elif name == 'agent':
+        df['agent_dob'] = _as_datetime(df.get('agent_dob'), dayfirst=False)
+        df['hire_date'] = _as_datetime(df.get('hire_date'), dayfirst=False)
 
     # Owner
-    if 'owner' in dataframes:
-        dataframes['owner']['owner_dob'] = pd.to_datetime(dataframes['owner'].get('owner_dob'), errors='coerce', dayfirst=False)
+    elif name == 'owner':
+        df['owner_dob'] = _as_datetime(df.get('owner_dob'), dayfirst=False)
 
     # Features
-    if 'features' in dataframes:
+    elif name == 'features':
         for col in ['feature_id', 'no_bedrooms', 'no_bathrooms', 'no_kitchens', 'no_floors', 'year_built',
                     'parking_area_sqft', 'lot_area_sqft', 'condition_rating']:
-            if col in dataframes['features'].columns:
-                dataframes['features'][col] = to_numeric_safe(dataframes['features'][col], fillna=0)
+            if col in df.columns:
+                df[col] = to_numeric_safe(df[col], fillna=0)
 
         # ensure integer columns become int when safe
         int_cols = ['feature_id', 'no_bedrooms', 'no_bathrooms', 'no_kitchens', 'no_floors', 'year_built']
         for c in int_cols:
-            if c in dataframes['features'].columns:
-                dataframes['features'][c] = dataframes['features'][c].round().astype(int)
+            if c in df.columns:
+                df[c] = df[c].round().astype(int)
 
     # Property
-    if 'property' in dataframes:
+    elif name == 'property':
         for col in ['property_id', 'address_id', 'owner_id', 'agent_id', 'feature_id']:
-            if col in dataframes['property'].columns:
-                dataframes['property'][col] = to_numeric_safe(dataframes['property'][col], fillna=0).round().astype(int)
-        if 'listing_date' in dataframes['property'].columns:
-            dataframes['property']['listing_date'] = pd.to_datetime(dataframes['property']['listing_date'], errors='coerce')
+            if col in df.columns:
+                df[col] = to_numeric_safe(df[col], fillna=0).round().astype(int)
+        if 'listing_date' in df.columns:
+            df['listing_date'] = _as_datetime(df['listing_date'])
 
-        if 'asking_amount' in dataframes['property'].columns:
-            dataframes['property']['asking_amount'] = to_numeric_safe(dataframes['property']['asking_amount'], fillna=np.nan)
+        if 'asking_amount' in df.columns:
+            df['asking_amount'] = to_numeric_safe(df['asking_amount'], fillna=np.nan)
 
     # Maintenance
-    if 'maintenance' in dataframes:
-        if 'maintenance_date' in dataframes['maintenance'].columns:
-            dataframes['maintenance']['maintenance_date'] = pd.to_datetime(dataframes['maintenance']['maintenance_date'], errors='coerce')
-        if 'cost' in dataframes['maintenance'].columns:
-            dataframes['maintenance']['cost'] = to_numeric_safe(dataframes['maintenance']['cost'], fillna=0)
+    elif name == 'maintenance':
+        if 'maintenance_date' in df.columns:
+            df['maintenance_date'] = _as_datetime(df['maintenance_date'])
+        if 'cost' in df.columns:
+            df['cost'] = to_numeric_safe(df['cost'], fillna=0)
 
     # Visit
-    if 'visit' in dataframes:
-        if 'visit_date' in dataframes['visit'].columns:
-            dataframes['visit']['visit_date'] = pd.to_datetime(dataframes['visit']['visit_date'], errors='coerce')
+    elif name == 'visit':
+        if 'visit_date' in df.columns:
+            df['visit_date'] = _as_datetime(df['visit_date'])
 
     # Commission
-    if 'commission' in dataframes:
-        if 'commission_id' in dataframes['commission'].columns:
-            dataframes['commission']['commission_id'] = to_numeric_safe(dataframes['commission']['commission_id'], fillna=0).round().astype(int)
-        if 'payment_date' in dataframes['commission'].columns:
-            dataframes['commission']['payment_date'] = pd.to_datetime(dataframes['commission']['payment_date'], errors='coerce')
-        if 'commission_amount' in dataframes['commission'].columns:
-            dataframes['commission']['commission_amount'] = to_numeric_safe(dataframes['commission']['commission_amount'], fillna=np.nan)
-        if 'commission_rate' in dataframes['commission'].columns:
-            dataframes['commission']['commission_rate'] = to_numeric_safe(dataframes['commission']['commission_rate'], fillna=np.nan)
-  
-    warnings.filterwarnings("ignore", message=" You are merging on int and float columns where the float values are not equal to their int representation.", category=UserWarning)
+    elif name == 'commission':
+        if 'commission_id' in df.columns:
+            df['commission_id'] = to_numeric_safe(df['commission_id'], fillna=0).round().astype(int)
+        if 'payment_date' in df.columns:
+            df['payment_date'] = _as_datetime(df['payment_date'])
+        if 'commission_amount' in df.columns:
+            df['commission_amount'] = to_numeric_safe(df['commission_amount'], fillna=np.nan)
+        if 'commission_rate' in df.columns:
+            df['commission_rate'] = to_numeric_safe(df['commission_rate'], fillna=np.nan)
+
     # Sale
-    if 'sale' in dataframes:
-        if 'sale_date' in dataframes['sale'].columns:
-            dataframes['sale']['sale_date'] = pd.to_datetime(dataframes['sale']['sale_date'], errors='coerce')
-        if 'sale_amount' in dataframes['sale'].columns:
-            dataframes['sale']['sale_amount'] = to_numeric_safe(dataframes['sale']['sale_amount'], fillna=np.nan)
-        if 'commission_id' in dataframes['sale'].columns:
-            dataframes['sale']['commission_id'] = to_numeric_safe(dataframes['sale']['commission_id'], fillna=0).round().astype(int)
+    elif name == 'sale':
+        if 'sale_date' in df.columns:
+            df['sale_date'] = _as_datetime(df['sale_date'])
+        if 'sale_amount' in df.columns:
+            df['sale_amount'] = to_numeric_safe(df['sale_amount'], fillna=np.nan)
+        if 'commission_id' in df.columns:
+            df['commission_id'] = to_numeric_safe(df['commission_id'], fillna=0).round().astype(int)
 
     # Rent
-    if 'rent' in dataframes:
+    elif name == 'rent':
         for col in ['rent_id', 'client_id', 'property_id', 'commission_id', 'contract_id']:
-            if col in dataframes['rent'].columns:
-                dataframes['rent'][col] = to_numeric_safe(dataframes['rent'][col], fillna=0).round().astype(int)
+            if col in df.columns:
+                df[col] = to_numeric_safe(df[col], fillna=0).round().astype(int)
         for date_col in ['agreement_date', 'rent_start_date', 'rent_end_date']:
-            if date_col in dataframes['rent'].columns:
-                dataframes['rent'][date_col] = pd.to_datetime(dataframes['rent'][date_col], errors='coerce')
-        if 'rent_amount' in dataframes['rent'].columns:
-            dataframes['rent']['rent_amount'] = to_numeric_safe(dataframes['rent']['rent_amount'], fillna=np.nan)
+            if date_col in df.columns:
+                df[date_col] = _as_datetime(df[date_col])
+        if 'rent_amount' in df.columns:
+            df['rent_amount'] = to_numeric_safe(df['rent_amount'], fillna=np.nan)
+
+    return df
+
 
+# DB Data Type Correction
+def correct_dtypes(dataframes):
+    """
+    Convert commonly used columns to the correct pandas dtypes.
+    Expects dataframes keys in lowercase: 'address','client','agent',...
+    """
+    # ---- CLEAN DUPLICATE HEADERS OR INVALID ROWS ----
+    # column-wise scrub: repeated header rows and fully empty rows are dropped, bad keys/values counted
+    scrub_tables(dataframes)
+
+    # ---- REMOVE TRUE DUPLICATE ROWS (same values across all columns) ----
+    for df_name, df in list(dataframes.items()):
+        dataframes[df_name], removed = dedupe_rows(df)
+        if removed:
+            print(f"🧹 Removed {removed} duplicate rows from '{df_name}'")
+
+    for name, df in dataframes.items():
+        dataframes[name] = coerce_table(name, df)
     return dataframes
 
 
@@ -218,117 +364,11 @@ def mode_impute(df):
 
 # Missing value filling function (logical)
 def fill_mv(dataframes):
-    # Ensure keys present
-    comm = dataframes.get('commission')
-    sale = dataframes.get('sale')
-    rent = dataframes.get('rent')
-
-    # 1) Fill missing commission_rate when possible
-    if comm is not None and 'commission_rate' in comm.columns:
-        missing_rate_ids = comm[comm['commission_rate'].isna()]['commission_id'].tolist()
-        for cid in missing_rate_ids:
-            # try sale first
-            if sale is not None and 'commission_id' in sale.columns and cid in sale['commission_id'].values:
-                sale_row = sale.loc[sale['commission_id'] == cid]
-                if 'sale_amount' in sale_row.columns and 'commission_amount' in comm.columns:
-                    sale_amount = pd.to_numeric(sale_row['sale_amount'].values[0], errors='coerce')
-                    commission_amount = pd.to_numeric(comm.loc[comm['commission_id'] == cid, 'commission_amount'].values[0], errors='coerce')
-                    if pd.notna(sale_amount) and pd.notna(commission_amount) and sale_amount != 0:
-                        comm.loc[comm['commission_id'] == cid, 'commission_rate'] = (commission_amount / sale_amount) * 100
-            # try rent
-            elif rent is not None and 'commission_id' in rent.columns and cid in rent['commission_id'].values:
-                rent_row = rent.loc[rent['commission_id'] == cid]
-                if 'rent_amount' in rent_row.columns and 'commission_amount' in comm.columns:
-                    rent_amount = pd.to_numeric(rent_row['rent_amount'].values[0], errors='coerce')
-                    commission_amount = pd.to_numeric(comm.loc[comm['commission_id'] == cid, 'commission_amount'].values[0], errors='coerce')
-                    if pd.notna(rent_amount) and pd.notna(commission_amount) and rent_amount != 0:
-                        comm.loc[comm['commission_id'] == cid, 'commission_rate'] = (commission_amount / rent_amount) * 100
-
-    # 2) Fill missing commission_amount when possible (commission_amount = base_amount * rate/100)
-    if comm is not None and 'commission_amount' in comm.columns:
-        missing_amt_ids = comm[comm['commission_amount'].isna()]['commission_id'].tolist()
-        for cid in missing_amt_ids:
-            # try sale
-            if sale is not None and 'commission_id' in sale.columns and cid in sale['commission_id'].values:
-                sale_row = sale.loc[sale['commission_id'] == cid]
-                rate = comm.loc[comm['commission_id'] == cid, 'commission_rate'].values[0]
-                sale_amount = pd.to_numeric(sale_row['sale_amount'].values[0], errors='coerce') if 'sale_amount' in sale_row.columns else np.nan
-                try:
-                    rate = float(rate)
-                except Exception:
-                    rate = np.nan
-                if pd.notna(sale_amount) and pd.notna(rate):
-                    comm.loc[comm['commission_id'] == cid, 'commission_amount'] = (sale_amount * rate) / 100.0
-            # try rent
-            elif rent is not None and 'commission_id' in rent.columns and cid in rent['commission_id'].values:
-                rent_row = rent.loc[rent['commission_id'] == cid]
-                rate = comm.loc[comm['commission_id'] == cid, 'commission_rate'].values[0]
-                rent_amount = pd.to_numeric(rent_row['rent_amount'].values[0], errors='coerce') if 'rent_amount' in rent_row.columns else np.nan
-                try:
-                    rate = float(rate)
-                except Exception:
-                    rate = np.nan
-                if pd.notna(rent_amount) and pd.notna(rate):
-                    comm.loc[comm['commission_id'] == cid, 'commission_amount'] = (rent_amount * rate) / 100.0
-
-    # 3) Fill missing rent_amount using commission_amount and commission_rate if available
-    if rent is not None and 'rent_amount' in rent.columns and comm is not None:
-        missing_rent_ids = rent[rent['rent_amount'].isna()]['rent_id'].tolist()
-        for rid in missing_rent_ids:
-            comm_id_series = rent.loc[rent['rent_id'] == rid, 'commission_id']
-            if comm_id_series.empty:
-                continue
-            comm_id = comm_id_series.values[0]
-            commission_amount = comm.loc[comm['commission_id'] == comm_id, 'commission_amount']
-            commission_rate = comm.loc[comm['commission_id'] == comm_id, 'commission_rate']
-            if commission_amount.empty or commission_rate.empty:
-                continue
-            commission_amount = pd.to_numeric(commission_amount.values[0], errors='coerce')
-            commission_rate = pd.to_numeric(commission_rate.values[0], errors='coerce')
-            if pd.notna(commission_amount) and pd.notna(commission_rate) and commission_rate != 0:
-                rent_amount = commission_amount / (commission_rate / 100.0)
-                rent.loc[rent['rent_id'] == rid, 'rent_amount'] = rent_amount
-
-    # 4) Fill missing sale_amount using commission_amount and commission_rate if available
-    if sale is not None and 'sale_amount' in sale.columns and comm is not None:
-        missing_sale_ids = sale[sale['sale_amount'].isna()]['sale_id'].tolist()
-        for sid in missing_sale_ids:
-            comm_id_series = sale.loc[sale['sale_id'] == sid, 'commission_id']
-            if comm_id_series.empty:
-                continue
-            comm_id = comm_id_series.values[0]
-            commission_amount = comm.loc[comm['commission_id'] == comm_id, 'commission_amount']
-            commission_rate = comm.loc[comm['commission_id'] == comm_id, 'commission_rate']
-            if commission_amount.empty or commission_rate.empty:
-                continue
-            commission_amount = pd.to_numeric(commission_amount.values[0], errors='coerce')
-            commission_rate = pd.to_numeric(commission_rate.values[0], errors='coerce')
-            if pd.notna(commission_amount) and pd.notna(commission_rate) and commission_rate != 0:
-                sale_amount = commission_amount / (commission_rate / 100.0)
-                sale.loc[sale['sale_id'] == sid, 'sale_amount'] = sale_amount
-
-    # Update the dataframes back
-    if comm is not None:
-        dataframes['commission'] = comm
-    if sale is not None:
-        dataframes['sale'] = sale
-    if rent is not None:
-        dataframes['rent'] = rent
-
-    # 5) KNN / mode imputation for remaining missing values
-    for key in list(dataframes.keys()):
-        df = dataframes[key]
-        numeric_df = df.select_dtypes(include=[np.number])
-        non_numeric_df = df.select_dtypes(exclude=[np.number])
-        if numeric_df.isna().sum().sum() > 0:
-            imputed_numeric_df = knn_impute(numeric_df)
-            for col in numeric_df.columns:
-                df[col] = imputed_numeric_df[col].values
-        if non_numeric_df.isna().sum().sum() > 0:
-            imputed_non_numeric_df = mode_impute(non_numeric_df.copy())
-            for col in non_numeric_df.columns:
-                df[col] = imputed_non_numeric_df[col].values
-        dataframes[key] = df
+    # 1-4) Derive commission_rate, commission_amount, rent_amount and sale_amount from each other
+    apply_derivations(dataframes)
+
+    # 5) Per-column imputation (group medians / KNN on measures / mode) for remaining missing values
+    impute_tables(dataframes)
 
     return dataframes
 
@@ -339,22 +379,15 @@ warnings.filterwarnings(
 )
 # --- Dimensional creation functions (kept your logic, safer casts) ---
 def create_date_dim(start_date, end_date):
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    date_dim = pd.DataFrame(date_range, columns=['Date'])
-    date_dim['Year'] = date_dim['Date'].dt.year
-    date_dim['Quarter'] = date_dim['Date'].dt.quarter
-    date_dim['Month'] = date_dim['Date'].dt.month
-    date_dim['Week'] = date_dim['Date'].apply(lambda x: (x - pd.Timestamp(x.year, 1, 1)).days // 7 + 1)
-    date_dim['Day'] = date_dim['Date'].dt.day
-    date_dim['DateID'] = range(1, len(date_dim) + 1)
-    return date_dim
-
-def create_loc_dim(address):
+    # vectorized calendar; ensure_date_dim (DateDimension.py) extends a persisted one
+    return build_calendar(start_date, end_date)
+
+def create_loc_dim(address, keys=None):
     location_dim = address[['address_id', 'zip_code', 'city', 'state']].drop_duplicates().reset_index(drop=True)
     location_dim['LocationID'] = location_dim['zip_code'].astype('str') + '_' + location_dim['city'].astype(str) + '_' + location_dim['state'].astype(str)
     location_dim.rename(columns={'zip_code': 'ZipCode', 'city': 'City', 'state': 'State'}, inplace=True)
     location_dim = location_dim[['address_id', 'LocationID', 'ZipCode', 'City', 'State']]
-    location_dim['LocationID'] = pd.factorize(location_dim['LocationID'])[0] + 1
+    location_dim['LocationID'] = assign_surrogate_keys(location_dim['LocationID'], keys, 'Dim_Location')
     location_dim['address_id'] = location_dim['address_id'].astype(int)
     location_dim['LocationID'] = location_dim['LocationID'].astype(int)
     location_dim['ZipCode'] = location_dim['ZipCode'].astype('str')
@@ -362,7 +395,7 @@ def create_loc_dim(address):
     location_dim['State'] = location_dim['State'].astype('str')
     return location_dim
 
-def create_agent_dim(agent):
+def create_agent_dim(agent, keys=None):
     agent_dim = agent.copy()
     agent_dim['Age'] = datetime.now().year - agent_dim['agent_dob'].dt.year
     agent_dim['AgeCat'] = pd.cut(agent_dim['Age'], bins=[0, 20, 45, 65, np.inf], labels=['Young', 'Adult', 'Middle Aged', 'Senior'], right=False)
@@ -370,7 +403,7 @@ def create_agent_dim(agent):
     agent_dim.rename(columns={'agent_gender': 'Gender', 'title': 'Position'}, inplace=True)
     agent_dim = agent_dim[['agent_id', 'Gender', 'AgeCat', 'AgentSince', 'Position']].drop_duplicates().reset_index(drop=True)
     agent_dim['AgentID'] = agent_dim['Gender'].astype(str) + '_' + agent_dim['AgeCat'].astype(str) + '_' + agent_dim['AgentSince'].astype(str) + '_' + agent_dim['Position'].astype(str)
-    agent_dim['AgentID'] = pd.factorize(agent_dim['AgentID'])[0] + 1
+    agent_dim['AgentID'] = assign_surrogate_keys(agent_dim['AgentID'], keys, 'Dim_Agent')
     agent_dim['agent_id'] = agent_dim['agent_id'].astype(int)
     agent_dim['AgentID'] = agent_dim['AgentID'].astype(int)
     agent_dim['Gender'] = agent_dim['Gender'].astype('str')
@@ -410,14 +443,14 @@ def create_propdet_dim(features):
     features_dim['Condition'] = features_dim['Condition'].astype('str')
     return features_dim
 
-def create_listing_dim(property, visit):
+def create_listing_dim(property, visit, keys=None):
     visits = visit.groupby('property_id').size().reset_index(name='NumVisits')
     listing_dim = pd.merge(property, visits, on='property_id', how='left')
     listing_dim['NumVisits'] = listing_dim['NumVisits'].fillna(0).astype(int)
     listing_dim.rename(columns={'listing_type': 'ListingType'}, inplace=True)
     listing_dim = listing_dim[['property_id', 'ListingType', 'NumVisits']].drop_duplicates().reset_index(drop=True)
     listing_dim['ListingID'] = listing_dim['ListingType'].astype(str) + '_' + listing_dim['NumVisits'].astype(str)
-    listing_dim['ListingID'] = pd.factorize(listing_dim['ListingID'])[0] + 1
+    listing_dim['ListingID'] = assign_surrogate_keys(listing_dim['ListingID'], keys, 'Dim_Listing')
     listing_dim['property_id'] = listing_dim['property_id'].astype(int)
     listing_dim['ListingID'] = listing_dim['ListingID'].astype(int)
     listing_dim['ListingType'] = listing_dim['ListingType'].astype('str')
@@ -450,12 +483,16 @@ def create_fact_trans(sale, rent, maintenance, property, commission, visit, star
     transactions['NegotiationDays']=transactions['NegotiationDays'].fillna(0).astype(int)
     transactions['ClosingDays']=(transactions['TransactionDate'] - transactions['listing_date']).dt.days
     
-    transactions=transactions[(transactions['TransactionDate']>=pd.Timestamp(start_date)) & (transactions['TransactionDate']<=pd.Timestamp(end_date))]
+    if start_date is not None:
+        transactions=transactions[transactions['TransactionDate']>=pd.Timestamp(start_date)]
+    if end_date is not None:
+        transactions=transactions[transactions['TransactionDate']<=pd.Timestamp(end_date)]
     transactions=transactions[['property_id','TransactionDate','TransactionAmount','asking_amount','cost','commission_rate','commission_amount','NegotiationDays','ClosingDays']]
     
     transactions=pd.merge(transactions,property[['property_id','address_id','agent_id','feature_id']],on='property_id',how='left')
     transactions.rename(columns={'TransactionDate':'Date'},inplace=True)
-    transactions=pd.merge(transactions,dimdate[['Date','DateID']],on='Date',how='left').drop(['Date'],axis=1)
+    transactions['DateID']=date_id_lookup(dimdate)(transactions['Date'])
+    transactions=transactions.drop(['Date'],axis=1)
     transactions=pd.merge(transactions,dimloc[['address_id','LocationID']],on='address_id',how='left').drop(['address_id'],axis=1)
     transactions=pd.merge(transactions,dimagent[['agent_id','AgentID']],on='agent_id',how='left').drop(['agent_id'],axis=1)
     transactions.rename(columns={'feature_id':'PropertyDetailsID'},inplace=True)
@@ -473,17 +510,18 @@ def create_fact_trans(sale, rent, maintenance, property, commission, visit, star
     
     return transactions
 
-def create_star_schema(sale, rent, maintenance, property, commission, visit, features, address, agent, start_date, end_date):
-    dimdate = create_date_dim(start_date=start_date, end_date=end_date)
-    dimloc = create_loc_dim(address=address)
-    dimagent = create_agent_dim(agent=agent)
-    dimprodet = create_propdet_dim(features=features)
-    dimlisting = create_listing_dim(property=property, visit=visit)
-    transactions = create_fact_trans(sale=sale, rent=rent, maintenance=maintenance, property=property, commission=commission, visit=visit,
-                                     start_date=start_date, end_date=end_date, dimdate=dimdate, dimloc=dimloc, dimagent=dimagent,
-                                     dimprodet=dimprodet, dimlisting=dimlisting)
+def build_date_dim(sale, rent, start_date=None, end_date=None, dim_date=None):
+    """Dim_Date covering the requested window, every transaction date in it and the previous run's calendar (dim_date)."""
+    dates = pd.concat([sale['sale_date'], rent['agreement_date']], ignore_index=True)
+    if start_date is not None:
+        dates = dates[dates >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        dates = dates[dates <= pd.Timestamp(end_date)]
+    return ensure_date_dim(existing=dim_date, dates=dates, start_date=start_date, end_date=end_date)
+
 
-    # tidy dims
+def tidy_star_dims(dimdate, dimloc, dimagent, dimprodet, dimlisting):
+    """Drop the natural keys the fact builder needed and put the dimension columns in warehouse order."""
     if 'address_id' in dimloc.columns:
         dimloc = dimloc.drop(['address_id'], axis=1).drop_duplicates().reset_index(drop=True)
     if 'agent_id' in dimagent.columns:
@@ -496,5 +534,21 @@ def create_star_schema(sale, rent, maintenance, property, commission, visit, fea
     dimagent = dimagent[['AgentID', 'Gender', 'AgeCat', 'AgentSince', 'Position']]
     dimprodet = dimprodet[['PropertyDetailsID', 'LotArea', 'Bedrooms', 'Bathrooms', 'Kitchens', 'Floors', 'ParkingArea', 'BuiltSince', 'Condition']]
     dimlisting = dimlisting[['ListingID', 'ListingType', 'NumVisits']]
+    return dimdate, dimloc, dimagent, dimprodet, dimlisting
+
+
+def create_star_schema(sale, rent, maintenance, property, commission, visit, features, address, agent, start_date=None, end_date=None,
+                       dim_date=None, key_registry=None, transaction_ids='sequence'):
+    dimdate = build_date_dim(sale, rent, start_date=start_date, end_date=end_date, dim_date=dim_date)
+    # surrogate keys come from the persisted registry when one is given (see KeyRegistry.py)
+    dimloc = create_loc_dim(address=address, keys=key_registry)
+    dimagent = create_agent_dim(agent=agent, keys=key_registry)
+    dimprodet = create_propdet_dim(features=features)
+    dimlisting = create_listing_dim(property=property, visit=visit, keys=key_registry)
+    # indexed-gather fact builder; create_fact_trans is kept as the reference (FactAssembly.benchmark_fact_assembly)
+    transactions = assemble_fact_trans(sale=sale, rent=rent, maintenance=maintenance, property=property, commission=commission, visit=visit,
+                                       start_date=start_date, end_date=end_date, dimdate=dimdate, dimloc=dimloc, dimagent=dimagent,
+                                       dimprodet=dimprodet, dimlisting=dimlisting, transaction_ids=transaction_ids)
 
+    dimdate, dimloc, dimagent, dimprodet, dimlisting = tidy_star_dims(dimdate, dimloc, dimagent, dimprodet, dimlisting)
     return dimdate, dimloc, dimagent, dimprodet, dimlisting, transactions
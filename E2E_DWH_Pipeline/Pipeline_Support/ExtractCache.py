@@ -0,0 +1,161 @@
+# Pipeline_Support/ExtractCache.py
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+
+
+BASE_DIR = os.path.dirname(__file__)
+CACHE_DIR = os.getenv('DWH_CACHE_DIR', os.path.join(os.path.dirname(BASE_DIR), '.cache', 'raw'))
+MAX_CACHE_BYTES = int(os.getenv('DWH_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+_INDEX_FILE = 'index.json'
+_LOCK = threading.Lock()
+_INDEXES = {}
+
+
+def _entry_key(source, table):
+    return f"{source}|{table.lower()}"
+
+
+def _load_index(cache_dir):
+    if cache_dir not in _INDEXES:
+        path = os.path.join(cache_dir, _INDEX_FILE)
+        index = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+        _INDEXES[cache_dir] = index
+    return _INDEXES[cache_dir]
+
+
+def _save_index(cache_dir, index):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = os.path.join(cache_dir, _INDEX_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, _INDEX_FILE))
+
+
+def content_fingerprint(data):
+    """Return a sha1 fingerprint for raw bytes/str content."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def cache_entry(source, table, cache_dir=None):
+    """
+    Return the cached metadata for (source, table) or None.
+    Metadata holds fingerprint, etag, last_modified and fetched_at (epoch seconds).
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    with _LOCK:
+        entry = _load_index(cache_dir).get(_entry_key(source, table))
+        if entry is None or not os.path.exists(os.path.join(cache_dir, entry['file'])):
+            return None
+        return dict(entry)
+
+
+def cache_load(source, table, fingerprint=None, cache_dir=None):
+    """
+    Load the cached frame for (source, table). If fingerprint is given the entry must match it.
+    Returns None on a miss. A hit refreshes the entry's LRU position.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    entry = cache_entry(source, table, cache_dir)
+    if entry is None or (fingerprint is not None and entry['fingerprint'] != fingerprint):
+        return None
+    try:
+        df = pd.read_pickle(os.path.join(cache_dir, entry['file']))
+    except Exception:
+        return None
+    with _LOCK:
+        index = _load_index(cache_dir)
+        key = _entry_key(source, table)
+        if key in index:
+            index[key]['last_access'] = time.time()
+            _save_index(cache_dir, index)
+    return df
+
+
+def cache_store(source, table, df, fingerprint, cache_dir=None, max_bytes=None, etag=None, last_modified=None):
+    """
+    Store a parsed frame under its content address (source, table, fingerprint) and evict
+    least recently used entries until the cache fits in max_bytes.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    os.makedirs(cache_dir, exist_ok=True)
+    file_name = hashlib.sha1(f"{_entry_key(source, table)}|{fingerprint}".encode('utf-8')).hexdigest() + '.pkl'
+    path = os.path.join(cache_dir, file_name)
+    tmp = path + f'.{threading.get_ident()}.tmp'
+    df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+    now = time.time()
+    with _LOCK:
+        index = _load_index(cache_dir)
+        key = _entry_key(source, table)
+        old = index.get(key)
+        if old is not None and old['file'] != file_name:
+            _remove_file(cache_dir, old['file'])
+        index[key] = {
+            'file': file_name,
+            'fingerprint': fingerprint,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': os.path.getsize(path),
+            'fetched_at': now,
+            'last_access': now,
+        }
+        _evict(cache_dir, index, max_bytes, keep=key)
+        _save_index(cache_dir, index)
+
+
+def touch_entry(source, table, cache_dir=None):
+    """Mark an entry as freshly revalidated (e.g. after an HTTP 304)."""
+    cache_dir = cache_dir or CACHE_DIR
+    with _LOCK:
+        index = _load_index(cache_dir)
+        key = _entry_key(source, table)
+        if key in index:
+            index[key]['fetched_at'] = index[key]['last_access'] = time.time()
+            _save_index(cache_dir, index)
+
+
+def clear_cache(cache_dir=None):
+    """Remove every cached table."""
+    cache_dir = cache_dir or CACHE_DIR
+    with _LOCK:
+        index = _load_index(cache_dir)
+        for entry in index.values():
+            _remove_file(cache_dir, entry['file'])
+        index.clear()
+        if os.path.isdir(cache_dir):
+            _save_index(cache_dir, index)
+
+
+def _remove_file(cache_dir, file_name):
+    try:
+        os.remove(os.path.join(cache_dir, file_name))
+    except OSError:
+        pass
+
+
+def _evict(cache_dir, index, max_bytes, keep=None):
+    total = sum(e['size'] for e in index.values())
+    for key, entry in sorted(index.items(), key=lambda kv: kv[1]['last_access']):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        _remove_file(cache_dir, entry['file'])
+        total -= entry['size']
+        del index[key]
+        print(f"🗑️ Cache: evicted '{key}' ({entry['size']} bytes)")
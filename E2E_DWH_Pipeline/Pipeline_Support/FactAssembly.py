@@ -0,0 +1,174 @@
+# Pipeline_Support/FactAssembly.py
+import time
+import numpy as np
+import pandas as pd
+from .DateDimension import date_id_lookup
+from .FactPartitions import source_transaction_ids
+
+
+FACT_COLUMNS = ['TransactionID', 'DateID', 'LocationID', 'AgentID', 'PropertyDetailsID', 'ListingID', 'MaintenanceExp',
+                'AskedAmount', 'TransactionValue', 'CommissionRate', 'CommissionValue', 'NegotiationDays', 'ClosingDays']
+
+
+def key_index(keys):
+    """
+    Index over a key column for repeated lookups (first row wins for a repeated key).
+    Returns (pd.Index of keys, row positions of those keys in the source).
+    """
+    keys = pd.Series(keys).reset_index(drop=True)
+    rows = np.flatnonzero(~keys.duplicated().to_numpy() & keys.notna().to_numpy())
+    return pd.Index(keys.to_numpy()[rows]), rows
+
+
+def _take(series, pos):
+    """series values at pos (-1 = no match -> NaN/NaT/NA, ints widen to float like a left merge does)."""
+    values = series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+    return pd.api.extensions.take(values, pos, allow_fill=True)
+
+
+class _Side:
+    """A side table or dimension indexed once on its key; columns are gathered by position."""
+
+    def __init__(self, df, key):
+        self.df = df.reset_index(drop=True)
+        self.index, self.rows = key_index(self.df[key])
+
+    def positions(self, keys):
+        pos = self.index.get_indexer(pd.Series(keys).to_numpy())
+        if not len(self.rows):
+            return pos
+        return np.where(pos >= 0, self.rows[np.maximum(pos, 0)], -1)
+
+    def gather(self, col, pos):
+        return _take(self.df[col], pos)
+
+
+def _side_rows(df, date_col, amount_col, source_ids):
+    return pd.DataFrame({
+        'property_id': df['property_id'].to_numpy(),
+        'commission_id': df['commission_id'].to_numpy(),
+        'Date': df[date_col].to_numpy(),
+        'TransactionValue': df[amount_col].to_numpy(),
+        'SourceID': source_ids,
+    })
+
+
+def transaction_rows(sale, rent, start_date=None, end_date=None):
+    """
+    Sale + rent rows reduced to the columns the fact needs, inside the [start_date, end_date] window.
+    Either side may be None (e.g. when the two are streamed one chunk at a time).
+    """
+    parts = []
+    if sale is not None:
+        parts.append(_side_rows(sale, 'sale_date', 'sale_amount', source_transaction_ids(sale['sale_id'], [])))
+    if rent is not None:
+        parts.append(_side_rows(rent, 'agreement_date', 'rent_amount', source_transaction_ids([], rent['rent_id'])))
+    tx = pd.concat(parts, ignore_index=True)
+
+    # fact window first, so nothing is gathered for rows that are dropped
+    keep = np.ones(len(tx), dtype=bool)
+    if start_date is not None:
+        keep &= (tx['Date'] >= pd.Timestamp(start_date)).to_numpy()
+    if end_date is not None:
+        keep &= (tx['Date'] <= pd.Timestamp(end_date)).to_numpy()
+    return tx[keep].reset_index(drop=True)
+
+
+class FactLookups:
+    """
+    The side tables and dimensions behind Fact_Transaction, each indexed once on its key and reduced
+    to the columns the fact reads, so any number of transaction batches can be resolved against them.
+    """
+
+    def __init__(self, maintenance, property, commission, visit, dimdate, dimloc, dimagent, dimlisting):
+        self.prop = _Side(property[['property_id', 'listing_date', 'address_id', 'agent_id', 'feature_id', 'asking_amount']],
+                          'property_id')
+        self.comm = _Side(commission[['commission_id', 'commission_rate', 'commission_amount']], 'commission_id')
+        self.cost = _Side(maintenance[['property_id', 'cost']].groupby('property_id', as_index=False).sum(), 'property_id')
+        self.last_visit = _Side(visit[['property_id', 'visit_date']].groupby('property_id', as_index=False).max(), 'property_id')
+        self.locations = _Side(dimloc[['address_id', 'LocationID']], 'address_id')
+        self.agents = _Side(dimagent[['agent_id', 'AgentID']], 'agent_id')
+        self.listings = _Side(dimlisting[['property_id', 'ListingID']], 'property_id')
+        self.set_date_dim(dimdate)
+
+    def set_date_dim(self, dimdate):
+        self.date_ids = date_id_lookup(dimdate)
+
+    def assemble(self, tx, transaction_ids='sequence', first_id=1):
+        """Fact rows for transaction_rows(...) output; 'sequence' ids are numbered from first_id."""
+        prop, comm = self.prop, self.comm
+        p = prop.positions(tx['property_id'])
+        c = comm.positions(tx['commission_id'])
+
+        date = tx['Date']
+        visit_date = pd.Series(self.last_visit.gather('visit_date', self.last_visit.positions(tx['property_id'])))
+        listing_date = pd.Series(prop.gather('listing_date', p))
+        negotiation = (date - visit_date).dt.days.fillna(0).astype(int)
+        closing = (date - listing_date).dt.days
+
+        locations, agents, listings, cost = self.locations, self.agents, self.listings, self.cost
+        fact = pd.DataFrame({
+            'TransactionID': (np.arange(first_id, first_id + len(tx)) if transaction_ids == 'sequence'
+                              else tx['SourceID'].to_numpy().astype('int64')),
+            'DateID': self.date_ids(date),
+            'LocationID': locations.gather('LocationID', locations.positions(prop.gather('address_id', p))),
+            'AgentID': agents.gather('AgentID', agents.positions(prop.gather('agent_id', p))),
+            'PropertyDetailsID': prop.gather('feature_id', p),
+            'ListingID': listings.gather('ListingID', listings.positions(tx['property_id'])),
+            'MaintenanceExp': pd.Series(cost.gather('cost', cost.positions(tx['property_id']))).fillna(0).astype(int),
+            'AskedAmount': prop.gather('asking_amount', p),
+            'TransactionValue': tx['TransactionValue'].to_numpy(),
+            'CommissionRate': comm.gather('commission_rate', c),
+            'CommissionValue': comm.gather('commission_amount', c),
+            # clamp negative durations at 0 (NaN stays NaN, like max(x, 0) did)
+            'NegotiationDays': negotiation.where(negotiation >= 0, 0),
+            'ClosingDays': closing.where(~(closing < 0), 0),
+        })
+        return fact[FACT_COLUMNS]
+
+
+def assemble_fact_trans(sale, rent, maintenance, property, commission, visit, start_date, end_date,
+                        dimdate, dimloc, dimagent, dimprodet, dimlisting, transaction_ids='sequence'):
+    """
+    Same result as create_fact_trans, built without the merge chain: every side table and dimension
+    is indexed once on its integer key and all foreign keys and measures are resolved with
+    position gathers over the sale + rent rows. Keys are expected to be unique per side table
+    (for a repeated key the first row is used where a merge would duplicate the transaction).
+    transaction_ids: 'sequence' numbers the facts 1..n like create_fact_trans; 'source' derives stable
+    ids from sale_id / rent_id (see FactPartitions.source_transaction_ids).
+    """
+    tx = transaction_rows(sale, rent, start_date, end_date)
+    lookups = FactLookups(maintenance, property, commission, visit, dimdate, dimloc, dimagent, dimlisting)
+    return lookups.assemble(tx, transaction_ids)
+
+
+def benchmark_fact_assembly(inputs, scale=1, repeat=3):
+    """
+    Time create_fact_trans against assemble_fact_trans on the same inputs (the create_fact_trans
+    keyword arguments), with sale and rent replicated `scale` times. Checks both give the same
+    table and returns {'merge_chain': s, 'gather': s, 'rows': n, 'speedup': x}.
+    """
+    from .ETL_SupportFunctions import create_fact_trans
+    args = dict(inputs)
+    if scale > 1:
+        args['sale'] = pd.concat([inputs['sale']] * scale, ignore_index=True)
+        args['rent'] = pd.concat([inputs['rent']] * scale, ignore_index=True)
+
+    timings = {}
+    for name, builder in (('merge_chain', create_fact_trans), ('gather', assemble_fact_trans)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = builder(**args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+        timings[name + '_result'] = result
+
+    pd.testing.assert_frame_equal(timings.pop('merge_chain_result').reset_index(drop=True),
+                                  timings.pop('gather_result').reset_index(drop=True), check_dtype=False)
+    timings['rows'] = len(result)
+    timings['speedup'] = timings['merge_chain'] / timings['gather'] if timings['gather'] else float('inf')
+    print(f"⏱️ Fact assembly ({timings['rows']} rows): merge chain {timings['merge_chain']:.3f}s, "
+          f"gather {timings['gather']:.3f}s ({timings['speedup']:.1f}x)")
+    return timings
@@ -0,0 +1,211 @@
+# Pipeline_Support/FactPartitions.py
+import os
+import glob
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from .Staging import staged_table_dir, to_arrow, STAR_SCHEMAS, COMPRESSION
+from .WarehouseLoader import copy_rows
+
+
+# Stable TransactionIDs: a sale keeps its sale_id, a rent becomes RENT_ID_OFFSET + rent_id
+RENT_ID_OFFSET = 1_000_000_000
+PERIOD_COLUMN = 'Period'
+FACT_NAME = 'Fact_Transaction'
+# A partitioned table's primary key must include the partition column
+FACT_KEY = ['TransactionID', PERIOD_COLUMN]
+
+
+def source_transaction_ids(sale_ids, rent_ids):
+    sale_ids = pd.to_numeric(pd.Series(sale_ids), errors='coerce').to_numpy(dtype='float64')
+    rent_ids = pd.to_numeric(pd.Series(rent_ids), errors='coerce').to_numpy(dtype='float64') + RENT_ID_OFFSET
+    return np.concatenate([sale_ids, rent_ids])
+
+
+def fact_periods(fact, dim_date):
+    """Year*100 + month of each fact row's date (0 where the DateID is unknown)."""
+    dates = dim_date.drop_duplicates('DateID').set_index('DateID')['Date']
+    d = pd.to_datetime(fact['DateID'].map(dates), errors='coerce')
+    return (d.dt.year * 100 + d.dt.month).fillna(0).astype('int64').to_numpy()
+
+
+def _fact_dir(staging_dir=None):
+    return staged_table_dir(FACT_NAME, 'star', staging_dir)
+
+
+def _partition_dir(period, staging_dir=None):
+    return os.path.join(_fact_dir(staging_dir), f'period={period}')
+
+
+def _read_partition(period, staging_dir=None):
+    path = _partition_dir(period, staging_dir)
+    if not glob.glob(os.path.join(path, 'part-*.parquet')):
+        return None
+    return pq.read_table(path, memory_map=True).to_pandas()
+
+
+def _period_filter(first=None, last=None):
+    flt = None
+    for cond in ([ds.field('period') >= first] if first is not None else []) + \
+                ([ds.field('period') <= last] if last is not None else []):
+        flt = cond if flt is None else flt & cond
+    return flt
+
+
+def _periods_holding(ids, staging_dir=None, missing=False, first=None, last=None):
+    """
+    Partitions that already hold any of these TransactionIDs (only the id column is scanned).
+    missing=True: the partitions from first to last (YYYYMM) holding ids *not* in ids.
+    """
+    root = _fact_dir(staging_dir)
+    if not glob.glob(os.path.join(root, 'period=*', 'part-*.parquet')):
+        return set()
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+    flt = ds.field('TransactionID').isin(list(ids))
+    if missing:
+        flt = ~flt
+        window = _period_filter(first, last)
+        if window is not None:
+            flt = flt & window
+    found = dataset.to_table(columns=['period'], filter=flt)
+    return {int(p) for p in found.column('period').to_pylist()}
+
+
+def _in_window(period, window):
+    if window is None:
+        return False
+    first, last = window
+    return (first is None or period >= first) and (last is None or period <= last)
+
+
+def month_period(date):
+    """YYYYMM of a date (None stays None)."""
+    if date is None:
+        return None
+    d = pd.Timestamp(date)
+    return d.year * 100 + d.month
+
+
+def _drop_unpartitioned(staging_dir=None):
+    # full-table part files from the replace/append layout carry sequence-numbered ids
+    legacy = glob.glob(os.path.join(_fact_dir(staging_dir), 'part-*.parquet'))
+    if legacy:
+        print("⚠️ Fact partitions: removing the unpartitioned Fact_Transaction files; "
+              "run once without incremental=True to rebuild the full history")
+        for f in legacy:
+            os.remove(f)
+
+
+def update_fact_partitions(new_facts, dim_date, staging_dir=None, complete=None):
+    """
+    Merge new or changed fact rows into the year/month partitions of the staged Fact_Transaction
+    (STAGING_DIR/star/Fact_Transaction/period=YYYYMM/). Only partitions that receive a row, or that
+    held an older version of a row, are rewritten; a row replaces the stored row with its TransactionID.
+    complete: (first, last) YYYYMM periods (None = open-ended) for which new_facts holds every fact,
+      as on a full extract; stored rows in those periods that new_facts lacks were deleted at the
+      source and are removed. Incremental extracts only see new rows, so they pass None and keep
+      deleted transactions until the next full run.
+    Returns {period: full partition frame} for the rewritten partitions.
+    """
+    _drop_unpartitioned(staging_dir)
+    periods = fact_periods(new_facts, dim_date)
+    ids = new_facts['TransactionID'].to_numpy()
+    touched = set(np.unique(periods).tolist()) | _periods_holding(ids, staging_dir)
+    if complete is not None:
+        touched |= _periods_holding(ids, staging_dir, missing=True, first=complete[0], last=complete[1])
+
+    schema = STAR_SCHEMAS[FACT_NAME]
+    rewritten = {}
+    removed = 0
+    for period in sorted(touched):
+        old = _read_partition(period, staging_dir)
+        if old is not None and _in_window(period, complete):
+            removed += int((~old['TransactionID'].isin(ids)).sum())
+        parts = [] if old is None or _in_window(period, complete) else [old[~old['TransactionID'].isin(ids)]]
+        parts.append(new_facts[periods == period])
+        merged = pd.concat([p for p in parts if len(p)] or [new_facts.head(0)], ignore_index=True)
+        merged = merged.sort_values('TransactionID').reset_index(drop=True)
+        path = _partition_dir(period, staging_dir)
+        shutil.rmtree(path, ignore_errors=True)
+        if len(merged):
+            os.makedirs(path)
+            pq.write_table(to_arrow(merged, schema), os.path.join(path, 'part-00000.parquet'), compression=COMPRESSION)
+        rewritten[period] = merged
+    print(f"🗂️ Fact partitions: {len(new_facts)} rows into {len(rewritten)} of "
+          f"{len(glob.glob(os.path.join(_fact_dir(staging_dir), 'period=*')))} periods"
+          + (f", {removed} deleted at the source removed" if removed else ""))
+    return rewritten
+
+
+def _staged_partitions(staging_dir=None):
+    """Every staged partition as {period: frame}."""
+    paths = glob.glob(os.path.join(_fact_dir(staging_dir), 'period=*'))
+    periods = sorted(int(os.path.basename(p).split('=', 1)[1]) for p in paths)
+    frames = {period: _read_partition(period, staging_dir) for period in periods}
+    return {period: df for period, df in frames.items() if df is not None}
+
+
+def _is_partitioned_pg(conn, table):
+    kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :t"), {"t": table}).scalar()
+    return kind == 'p' if kind is not None else None
+
+
+def _has_fact_key(engine, conn, table):
+    pk = engine.dialect.get_pk_constraint(conn, table).get('constrained_columns') or []
+    return sorted(pk) == sorted(FACT_KEY)
+
+
+def load_fact_partitions(partitions, engine, table='fact_transaction', staging_dir=None):
+    """
+    Replace the rewritten partitions in the warehouse, in one transaction.
+    On Postgres the table is LIST-partitioned on Period (one child table per month, created on
+    demand) and each touched child is truncated and reloaded; other databases get a plain table
+    with a Period column and DELETE + INSERT per period. Either way the table is keyed on
+    (TransactionID, Period). A fact table from an unpartitioned run, or one without that key, is
+    replaced, and then every staged partition is loaded, not only the rewritten ones.
+    """
+    if not partitions:
+        return
+    sample = next(iter(partitions.values())).head(0).assign(**{PERIOD_COLUMN: pd.Series(dtype='int64')})
+    with engine.begin() as conn:
+        postgres = engine.dialect.name == 'postgresql'
+        exists = engine.dialect.has_table(conn, table)
+        if exists:
+            if postgres:
+                reason = None if _is_partitioned_pg(conn, table) else 'unpartitioned'
+            elif PERIOD_COLUMN not in {c['name'] for c in engine.dialect.get_columns(conn, table)}:
+                reason = f'no {PERIOD_COLUMN} column'
+            else:
+                reason = None
+            if reason is None and not _has_fact_key(engine, conn, table):
+                reason = 'no (TransactionID, Period) key'
+            if reason:
+                print(f"⚠️ Fact partitions: replacing '{table}' ({reason}) with a period-keyed table")
+                conn.execute(text(f'DROP TABLE "{table}"' + (' CASCADE' if postgres else '')))
+                partitions = _staged_partitions(staging_dir)
+                exists = False
+        if not exists:
+            ddl = pd.io.sql.get_schema(sample, table, keys=FACT_KEY, con=conn)
+            conn.execute(text(ddl + (f' PARTITION BY LIST ("{PERIOD_COLUMN}")' if postgres else '')))
+
+        for period, frame in partitions.items():
+            rows = frame.assign(**{PERIOD_COLUMN: period})
+            if postgres:
+                child = f'{table}_p{period}'
+                conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{child}" PARTITION OF "{table}" FOR VALUES IN ({int(period)})'))
+                conn.execute(text(f'TRUNCATE "{child}"'))
+                copy_rows(conn, rows, child)
+            else:
+                conn.execute(text(f'DELETE FROM "{table}" WHERE "{PERIOD_COLUMN}" = :p'), {"p": int(period)})
+                copy_rows(conn, rows, table)
+    print(f"⬆️ Fact partitions: reloaded {len(partitions)} periods in '{table}'")
+
+
+def read_fact_partitions(staging_dir=None, periods=None):
+    """Read the partitioned Fact_Transaction back (optionally only some periods) without the period column."""
+    dataset = ds.dataset(_fact_dir(staging_dir), format='parquet', partitioning='hive')
+    flt = ds.field('period').isin(list(periods)) if periods is not None else None
+    return dataset.to_table(filter=flt).drop(['period']).to_pandas()
@@ -0,0 +1,179 @@
+# Pipeline_Support/Imputation.py
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.impute import KNNImputer
+from sklearn.neighbors import NearestNeighbors
+from .SourceSchemas import PRIMARY_KEYS
+
+
+N_NEIGHBORS = 5
+# Up to this many rows KNNImputer's exact pairwise search is used; above it neighbours come from
+# a fitted sample searched in blocks, so memory stays O(block x sample) instead of O(n^2)
+KNN_EXACT_MAX_ROWS = 20000
+KNN_SAMPLE_ROWS = 20000
+KNN_BLOCK_ROWS = 10000
+
+# Per-column overrides; everything else falls back to default_strategy().
+# Strategies: {'strategy': 'skip' | 'mode' | 'median' (by=[group cols]) | 'knn' (features=[cols])}
+IMPUTATION_STRATEGIES = {
+    # sale and rent listings ask very different amounts
+    'property': {'asking_amount': {'strategy': 'median', 'by': ['listing_type']}},
+    'commission': {'commission_rate': {'strategy': 'knn', 'features': ['commission_amount']}},
+}
+
+
+# Columns that identify something rather than measure it (zip_code, agent_phone, ...): an averaged
+# or borrowed value would be a wrong identifier, e.g. a made-up zip code feeding LocationID
+IDENTIFIER_HINTS = ('zip', 'phone', 'email', 'username', 'password')
+
+
+def _is_key(table, col):
+    return col.endswith('_id') or col in PRIMARY_KEYS.get(table, [])
+
+
+def _is_identifier(col):
+    return col.endswith('_code') or any(hint in col for hint in IDENTIFIER_HINTS)
+
+
+def default_strategy(table, col, series):
+    """
+    Keys and identifier-like columns are never invented; other numeric columns use KNN over the
+    table's measures, the rest the mode.
+    """
+    if _is_key(table, col) or _is_identifier(col):
+        return {'strategy': 'skip'}
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return {'strategy': 'knn'}
+    return {'strategy': 'mode'}
+
+
+def _put(df, col, values):
+    """Write imputed floats back, keeping integer columns integer."""
+    if pd.api.types.is_integer_dtype(df[col]):
+        values = np.round(values)
+    df[col] = pd.Series(values, index=df.index).astype(df[col].dtype)
+
+
+def fill_median(df, col, by=None):
+    s = df[col]
+    if by:
+        by = [b for b in by if b in df.columns]
+    if by:
+        s = s.fillna(df.groupby(by, observed=True, dropna=True)[col].transform('median'))
+    df[col] = s.fillna(df[col].median())
+
+
+def fill_mode(df, col):
+    mode = df[col].mode()
+    if not mode.empty:
+        df[col] = df[col].fillna(mode.iloc[0])
+    elif df[col].dtype == object:
+        df[col] = df[col].fillna("")
+
+
+def _blocked_knn(X, k, sample_rows, block_rows, rng):
+    """
+    KNN imputation for large arrays: donors are a sample of complete rows; rows are searched in blocks,
+    grouped by which columns they do have (the same columns nan_euclidean would compare on).
+    """
+    out = X.copy()
+    missing = np.isnan(X)
+    complete = np.flatnonzero(~missing.any(axis=1))
+    if len(complete) == 0:
+        return out
+    if len(complete) > sample_rows:
+        complete = rng.choice(complete, sample_rows, replace=False)
+    donors = X[complete]
+    k = min(k, len(donors))
+    rows = np.flatnonzero(missing.any(axis=1))
+    patterns, inverse = np.unique(missing[rows], axis=0, return_inverse=True)
+    for p, pattern in enumerate(patterns):
+        observed = ~pattern
+        if not observed.any():
+            continue
+        nn = NearestNeighbors(n_neighbors=k).fit(donors[:, observed])
+        targets = rows[inverse.ravel() == p]
+        for start in range(0, len(targets), block_rows):
+            block = targets[start:start + block_rows]
+            _, idx = nn.kneighbors(X[np.ix_(block, observed)])
+            out[np.ix_(block, pattern)] = donors[:, pattern][idx].mean(axis=1)
+    return out
+
+
+def fill_knn(df, cols, features=None, n_neighbors=N_NEIGHBORS, exact_max_rows=KNN_EXACT_MAX_ROWS,
+             sample_rows=KNN_SAMPLE_ROWS, block_rows=KNN_BLOCK_ROWS, random_state=0):
+    """Impute cols from their nearest neighbours over cols + features; rows with nothing to compare use the median."""
+    used = [c for c in dict.fromkeys(list(cols) + list(features or [])) if c in df.columns and df[c].notna().any()]
+    if not used:
+        return
+    X = df[used].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64')
+    if len(X) <= exact_max_rows:
+        X = KNNImputer(n_neighbors=n_neighbors).fit_transform(X)
+    else:
+        X = _blocked_knn(X, n_neighbors, sample_rows, block_rows, np.random.default_rng(random_state))
+    for i, col in enumerate(used):
+        if col in cols:
+            _put(df, col, X[:, i])
+            if df[col].isna().any():
+                df[col] = df[col].fillna(df[col].median())
+
+
+def impute_table(table, df, strategies=None):
+    """
+    Impute one table column by column. Returns (df, {column: (strategy label, values filled)}).
+    Plain knn columns are imputed together over the table's numeric measures (no keys or identifiers).
+    """
+    overrides = (strategies if strategies is not None else IMPUTATION_STRATEGIES).get(table, {})
+    report = {}
+    knn_group = []
+    for col in df.columns:
+        n_missing = int(df[col].isna().sum())
+        if not n_missing:
+            continue
+        spec = overrides.get(col) or default_strategy(table, col, df[col])
+        kind = spec['strategy']
+        if kind == 'skip':
+            report[col] = ('skip', 0)
+            continue
+        if kind == 'median':
+            fill_median(df, col, spec.get('by'))
+            label = f"median by {', '.join(spec['by'])}" if spec.get('by') else 'median'
+        elif kind == 'mode':
+            fill_mode(df, col)
+            label = 'mode'
+        elif kind == 'knn' and spec.get('features') is not None:
+            fill_knn(df, [col], spec['features'])
+            label = f"knn on {', '.join(spec['features'])}"
+        elif kind == 'knn':
+            knn_group.append((col, n_missing))
+            continue
+        else:
+            raise ValueError(f"Unknown imputation strategy '{kind}' for {table}.{col}")
+        report[col] = (label, n_missing - int(df[col].isna().sum()))
+
+    if knn_group:
+        features = [c for c in df.columns if not _is_key(table, c) and not _is_identifier(c)
+                    and pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+        fill_knn(df, [c for c, _ in knn_group], features)
+        for col, n_missing in knn_group:
+            report[col] = ('knn', n_missing - int(df[col].isna().sum()))
+    return df, report
+
+
+def print_impute_report(name, report):
+    for col, (label, filled) in report.items():
+        print(f"🩹 {name}.{col}: {filled} values imputed ({label})")
+
+
+def impute_tables(dataframes, strategies=None, max_workers=4):
+    """Run impute_table over every table with missing values, several tables at a time."""
+    todo = [name for name, df in dataframes.items() if df is not None and df.isna().any().any()]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo) or 1))) as pool:
+        results = pool.map(lambda name: (name, *impute_table(name, dataframes[name], strategies)), todo)
+        reports = {}
+        for name, df, report in results:
+            dataframes[name] = df
+            reports[name] = report
+            print_impute_report(name, report)
+    return reports
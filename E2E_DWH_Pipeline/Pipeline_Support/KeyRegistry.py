@@ -0,0 +1,87 @@
+# Pipeline_Support/KeyRegistry.py
+import os
+import glob
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+
+BASE_DIR = os.path.dirname(__file__)
+KEY_REGISTRY_DIR = os.getenv('DWH_KEY_REGISTRY_DIR', os.path.join(os.path.dirname(BASE_DIR), '.state', 'keys'))
+KEY_REGISTRY_TABLE = 'key_registry'
+
+
+def _keys_frame(keys):
+    return pd.DataFrame({'natural_key': keys.index.astype(str), 'surrogate_key': keys.to_numpy(dtype='int64')})
+
+
+def _as_series(df):
+    return pd.Series(df['surrogate_key'].to_numpy(dtype='int64'), index=pd.Index(df['natural_key'].astype(str)))
+
+
+def load_key_registry(path=None, engine=None):
+    """
+    Load the natural-key -> surrogate-key registry as {dimension: Series(surrogate key, index=natural key)}.
+    The registry lives in one Parquet file per dimension under path (KEY_REGISTRY_DIR by default),
+    or in the KEY_REGISTRY_TABLE table when a warehouse engine is given. Empty on a first run.
+    """
+    registry = {}
+    if engine is not None:
+        with engine.connect() as conn:
+            exists = engine.dialect.has_table(conn, KEY_REGISTRY_TABLE)
+            if exists:
+                df = pd.read_sql(text(f'SELECT dimension, natural_key, surrogate_key FROM {KEY_REGISTRY_TABLE}'), conn)
+                for dim, part in df.groupby('dimension'):
+                    registry[dim] = _as_series(part.sort_values('surrogate_key'))
+        return registry
+    for file in glob.glob(os.path.join(path or KEY_REGISTRY_DIR, '*.parquet')):
+        registry[os.path.splitext(os.path.basename(file))[0]] = _as_series(pd.read_parquet(file))
+    return registry
+
+
+def save_key_registry(registry, path=None, engine=None):
+    """
+    Persist the registry. Files are rewritten atomically; in the warehouse table only keys
+    above the stored maximum are inserted, since existing keys never change.
+    """
+    if engine is not None:
+        with engine.begin() as conn:
+            stored = {}
+            if engine.dialect.has_table(conn, KEY_REGISTRY_TABLE):
+                rows = conn.execute(text(f'SELECT dimension, MAX(surrogate_key) FROM {KEY_REGISTRY_TABLE} GROUP BY dimension'))
+                stored = {dim: top for dim, top in rows}
+            for dim, keys in registry.items():
+                new = keys[keys > (stored.get(dim) or 0)]
+                if len(new):
+                    _keys_frame(new).assign(dimension=dim).to_sql(KEY_REGISTRY_TABLE, conn, if_exists='append', index=False)
+        return
+    out_dir = path or KEY_REGISTRY_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    for dim, keys in registry.items():
+        target = os.path.join(out_dir, f'{dim}.parquet')
+        tmp = target + '.tmp'
+        _keys_frame(keys).to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+
+
+def assign_surrogate_keys(natural_keys, registry=None, dimension=None):
+    """
+    Surrogate keys for a Series of natural keys. Keys already in registry[dimension] keep their id;
+    unseen ones get the next ids in order of first appearance (so an empty registry numbers them
+    exactly like pd.factorize(...) + 1). The registry is updated in place.
+    Returns an int64 numpy array aligned with natural_keys.
+    """
+    natural = natural_keys.astype(str)
+    if registry is None:
+        return pd.factorize(natural)[0].astype('int64') + 1
+    known = registry.get(dimension, pd.Series(dtype='int64'))
+    pos = known.index.get_indexer(natural)
+    unseen = pd.unique(natural[pos < 0])
+    if len(unseen):
+        start = int(known.max()) + 1 if len(known) else 1
+        added = pd.Series(np.arange(start, start + len(unseen), dtype='int64'), index=pd.Index(unseen))
+        known = pd.concat([known, added]) if len(known) else added
+        registry[dimension] = known
+        print(f"🔑 {dimension}: {len(unseen)} new keys ({len(known)} total)")
+        pos = known.index.get_indexer(natural)
+    return known.to_numpy()[pos]
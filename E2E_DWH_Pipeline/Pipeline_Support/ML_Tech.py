@@ -7,6 +7,8 @@ from sklearn.ensemble import RandomForestRegressor, IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import joblib
+from .Staging import staged_exists, read_staged
+from .ArtifactSink import current_artifact
 
 
 BASE_DIR = os.path.dirname(__file__)
@@ -18,15 +20,27 @@ os.makedirs(MODELS_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def load_fact_snapshot(path: str = None) -> pd.DataFrame:
-    """Load the Fact snapshot CSV. If path is None will use project default.
+def load_fact_snapshot(path: str = None, columns: list = None) -> pd.DataFrame:
+    """Load the Fact snapshot. If path is None will use project default.
 
-    Returns a pandas DataFrame ready for analytics.
+    The snapshot published in this session (create_fact_snapshot, see ArtifactSink.py) is used as is;
+    next the typed Parquet snapshot in the staging area (memory-mapped, only `columns` decoded, no
+    cleanup needed); a .parquet path is read the same way. Otherwise the CSV export is parsed and
+    scrubbed. Returns a pandas DataFrame ready for analytics.
     """
+    if path is None:
+        published = current_artifact('Fact_Snapshot', columns)
+        if published is not None:
+            return published.copy()
+    if path is None and staged_exists('Fact_Snapshot'):
+        return read_staged('Fact_Snapshot', columns=columns)
+    if path is not None and (path.endswith('.parquet') or os.path.isdir(path)):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+
     p = path or FACT_SNAPSHOT_PATH
     if not os.path.exists(p):
         raise FileNotFoundError(f"Fact snapshot not found at {p}")
-    df = pd.read_csv(p, parse_dates=['Date'])
+    df = pd.read_csv(p, parse_dates=['Date'], usecols=columns)
 
     # Defensive numeric coercion: many CSV exports may keep thousand separators or stray symbols.
     def _clean_and_coerce(col_series):
@@ -0,0 +1,104 @@
+# Pipeline_Support/MemoryOptimizer.py
+import gc
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Text columns become categoricals when at most this share of their values are distinct
+CATEGORY_MAX_RATIO = 0.5
+
+
+def frame_memory(df):
+    """Bytes held by a frame, counting the Python strings inside object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(frames):
+    return {name: frame_memory(df) for name, df in frames.items() if df is not None}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where the platform does not report it)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _smallest_int(s):
+    """Smallest integer dtype holding every value of s, nullable when s is (None when it cannot shrink)."""
+    values = s.dropna()
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    nullable = isinstance(s.dtype, pd.api.extensions.ExtensionDtype)
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f'int{bits}')
+        if info.min <= lo and hi <= info.max:
+            target = f'Int{bits}' if nullable else f'int{bits}'
+            return target if np.dtype(f'int{bits}').itemsize < s.dtype.itemsize else None
+    return None
+
+
+def _lossless_float32(s):
+    values = s.to_numpy(dtype='float64')
+    with np.errstate(over='ignore'):
+        back = values.astype('float32').astype('float64')
+    return bool(np.all((back == values) | np.isnan(values)))
+
+
+def optimize_frame(df, downcast_ints=True, downcast_floats=False, categories=True,
+                   category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    Shrink one frame in place of a copy:
+    - integers move to the smallest width that holds their range;
+    - floats move to float32 only when no value changes (off by default: the star-schema code writes
+      float64 results into measure columns, which pandas refuses on a float32 column);
+    - repeated text becomes categorical.
+    Dates, bools and already categorical columns are left alone.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(s):
+            target = _smallest_int(s) if downcast_ints else None
+            if target is not None:
+                out[col] = s.astype(target)
+        elif pd.api.types.is_float_dtype(s):
+            if downcast_floats and s.dtype.itemsize > 4 and _lossless_float32(s):
+                out[col] = s.astype('float32')
+        elif categories and (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)) and len(s):
+            if s.nunique(dropna=True) <= category_max_ratio * len(s):
+                out[col] = s.astype('category')
+    return df.assign(**out) if out else df
+
+
+def optimize_frames(frames, label='', **kwargs):
+    """optimize_frame over a dict of tables (replaced in the dict) with a before/after report."""
+    before = memory_report(frames)
+    for name, df in frames.items():
+        if df is not None:
+            frames[name] = optimize_frame(df, **kwargs)
+    print_memory_report(before, memory_report(frames), label)
+    return frames
+
+
+def print_memory_report(before, after, label=''):
+    print(f"🧠 Memory{' (' + label + ')' if label else ''}:")
+    for name in before:
+        b, a = before[name], after.get(name, 0)
+        print(f"   {name:<22} {b / 1e6:8.2f} MB -> {a / 1e6:8.2f} MB ({(1 - a / b) * 100 if b else 0:5.1f}% less)")
+    tb, ta = sum(before.values()), sum(after.values())
+    rss = peak_rss_mb()
+    print(f"   {'total':<22} {tb / 1e6:8.2f} MB -> {ta / 1e6:8.2f} MB"
+          + (f" | peak RSS {rss:.0f} MB" if rss is not None else ""))
+
+
+def release(frames):
+    """Drop every frame in a dict that later stages no longer need and return the memory to the allocator."""
+    frames.clear()
+    gc.collect()
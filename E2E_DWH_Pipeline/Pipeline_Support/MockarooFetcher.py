@@ -0,0 +1,160 @@
+# Pipeline_Support/MockarooFetcher.py
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import requests
+import pandas as pd
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from .SourceSchemas import apply_schema, SCHEMA_VERSION
+from .ExtractCache import cache_entry, cache_load, cache_store, content_fingerprint
+
+
+# Point MOCKAROO_BASE_URL at a local fixture server (http://localhost:8000) or a directory of
+# <table>.json files to run hybrid mode offline.
+MOCKAROO_BASE_URL = os.getenv('MOCKAROO_BASE_URL', 'https://my.api.mockaroo.com')
+CACHE_TTL = 24 * 3600
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _local_dir(base_url):
+    if base_url.startswith('file://'):
+        return url2pathname(urlparse(base_url).path)
+    if os.path.isdir(base_url):
+        return base_url
+    return None
+
+
+def _to_frame(payload, tbl):
+    # Ensure payload is a list of records
+    if isinstance(payload, dict):
+        payload = [payload]
+    return apply_schema(pd.DataFrame(payload), tbl)
+
+
+def _fetch_local(tbl, local_dir):
+    path = os.path.join(local_dir, f'{tbl}.json')
+    if not os.path.exists(path):
+        return None, 'no fixture'
+    with open(path) as f:
+        return _to_frame(json.load(f), tbl), 'fixture'
+
+
+async def _fetch_remote(tbl, base_url, api_key, semaphore, deadline, retries, backoff, timeout, cache, cache_ttl):
+    url = f"{base_url.rstrip('/')}/{tbl}.json"
+    source = f"mockaroo:{base_url}"
+    fingerprint = content_fingerprint(f"{url}|{api_key}|{SCHEMA_VERSION}")
+    if cache:
+        entry = cache_entry(source, tbl)
+        if entry is not None and entry['fingerprint'] == fingerprint and time.time() - entry['fetched_at'] < cache_ttl:
+            df = cache_load(source, tbl, fingerprint)
+            if df is not None:
+                return df, 'cache'
+
+    params = {'key': api_key} if api_key else None
+    last_error = None
+    async with semaphore:
+        for attempt in range(retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                last_error = 'time budget exhausted'
+                break
+            try:
+                resp = await asyncio.to_thread(requests.get, url, params=params, timeout=min(timeout, remaining))
+                if resp.status_code == 200:
+                    df = _to_frame(resp.json(), tbl)
+                    if cache and not df.empty:
+                        cache_store(source, tbl, df, fingerprint)
+                    return df, f'network (attempt {attempt + 1})'
+                last_error = f'status {resp.status_code}'
+                if resp.status_code not in RETRY_STATUSES:
+                    break
+            except (requests.RequestException, ValueError) as e:
+                last_error = str(e)
+            # exponential backoff with a little jitter, never sleeping past the budget
+            delay = backoff * (2 ** attempt) * (1 + random.random() / 4)
+            await asyncio.sleep(max(0, min(delay, deadline - time.monotonic())))
+
+    # fall back to a stale cached response rather than losing the table
+    if cache:
+        df = cache_load(source, tbl, fingerprint)
+        if df is not None:
+            return df, f'stale cache ({last_error})'
+    return None, last_error
+
+
+async def _fetch_all(tables, base_url, api_key, max_concurrency, retries, backoff, timeout, time_budget, cache, cache_ttl):
+    deadline = time.monotonic() + time_budget
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = {
+        tbl: asyncio.create_task(_fetch_remote(tbl, base_url, api_key, semaphore, deadline,
+                                               retries, backoff, timeout, cache, cache_ttl))
+        for tbl in tables
+    }
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(0, deadline - time.monotonic()))
+    for task in pending:
+        task.cancel()
+    results = {}
+    for tbl, task in tasks.items():
+        if task in done and task.exception() is None:
+            results[tbl] = task.result()
+        elif task in done:
+            results[tbl] = (None, str(task.exception()))
+        else:
+            results[tbl] = (None, 'time budget exhausted')
+    return results
+
+
+def _run(coro):
+    """asyncio.run that also works inside a running loop (e.g. a Jupyter kernel)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    box = {}
+    def target():
+        try:
+            box['result'] = asyncio.run(coro)
+        except BaseException as e:
+            box['error'] = e
+    worker = threading.Thread(target=target)
+    worker.start()
+    worker.join()
+    if 'error' in box:
+        raise box['error']
+    return box['result']
+
+
+def fetch_mockaroo(tables, api_key=None, base_url=None, max_concurrency=6, retries=3, backoff=0.5,
+                   timeout=30, time_budget=120, cache=True, cache_ttl=CACHE_TTL):
+    """
+    Fetch synthetic rows for every table concurrently from Mockaroo (or a local stand-in).
+    - base_url: Mockaroo API root, a local fixture server url, or a directory / file:// url
+      holding <table>.json files (defaults to MOCKAROO_BASE_URL).
+    - Failed requests (network errors, 429, 5xx) are retried with exponential backoff.
+    - time_budget caps the whole fetch in seconds; tables not done by then are skipped.
+    - Responses are cached on disk for cache_ttl seconds and reused as a fallback when a fetch fails.
+    Returns dict table -> DataFrame (tables without rows are left out).
+    """
+    base_url = base_url or MOCKAROO_BASE_URL
+    local_dir = _local_dir(base_url)
+    if local_dir is not None:
+        results = {tbl: _fetch_local(tbl, local_dir) for tbl in tables}
+    else:
+        results = _run(_fetch_all(tables, base_url, api_key, max_concurrency, retries, backoff,
+                                  timeout, time_budget, cache, cache_ttl))
+
+    mock_data = {}
+    for tbl in tables:
+        df, origin = results[tbl]
+        if df is None:
+            print(f"Mockaroo: skipped '{tbl}' ({origin})")
+        elif df.empty:
+            print(f"Mockaroo: no rows returned for '{tbl}'")
+        else:
+            mock_data[tbl] = df
+            print(f"Mockaroo: fetched {len(df)} rows for '{tbl}' ({origin})")
+    return mock_data
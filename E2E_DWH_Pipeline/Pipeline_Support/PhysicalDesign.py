@@ -0,0 +1,185 @@
+# Pipeline_Support/PhysicalDesign.py
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import DBAPIError
+from .WarehouseLoader import STAR_INDEXES, _q, _index_name
+
+
+FACT_TABLE = 'fact_transaction'
+# Fact column -> dimension it references (by the dimension's primary key of the same name)
+STAR_FOREIGN_KEYS = {
+    'DateID': 'dim_date',
+    'LocationID': 'dim_location',
+    'AgentID': 'dim_agent',
+    'PropertyDetailsID': 'dim_propertydetails',
+    'ListingID': 'dim_listing',
+}
+
+# Pre-aggregated rollups for the DimensionalQueries / Power BI slices: materialized views on Postgres
+# (with a unique index on the group columns, so they can be refreshed concurrently), plain views
+# elsewhere or with 'materialized': False. Sums and counts rather than averages, so coarser rollups
+# can be computed from them. Other modules register their own views here (e.g. FactSnapshot.py).
+AGGREGATE_VIEWS = {
+    'agg_quarter_listing_state': {
+        'keys': ['Year', 'Quarter', 'ListingType', 'State'],
+        'tables': ['fact_transaction', 'dim_date', 'dim_listing', 'dim_location'],
+        'sql': """
+            SELECT d."Year", d."Quarter",
+                   COALESCE(l."ListingType", 'Unknown') AS "ListingType",
+                   COALESCE(g."State", 'Unknown') AS "State",
+                   COUNT(*) AS "Transactions",
+                   SUM(f."TransactionValue") AS "TotalTransactionValue",
+                   SUM(f."AskedAmount") AS "TotalAskedAmount",
+                   SUM(f."CommissionValue") AS "TotalCommissionValue",
+                   SUM(f."CommissionRate") AS "SumCommissionRate",
+                   SUM(f."MaintenanceExp") AS "TotalMaintenanceExp",
+                   SUM(f."NegotiationDays") AS "TotalNegotiationDays",
+                   SUM(f."ClosingDays") AS "TotalClosingDays"
+            FROM fact_transaction f
+            JOIN dim_date d ON f."DateID" = d."DateID"
+            LEFT JOIN dim_listing l ON f."ListingID" = l."ListingID"
+            LEFT JOIN dim_location g ON f."LocationID" = g."LocationID"
+            GROUP BY d."Year", d."Quarter", COALESCE(l."ListingType", 'Unknown'), COALESCE(g."State", 'Unknown')
+        """,
+    },
+}
+
+
+def ensure_indexes(conn, tables=None):
+    """
+    The secondary indexes of STAR_INDEXES (fact foreign keys, BRIN on DateID) on tables the loader
+    did not build them for, e.g. the partitioned fact table or one created by a merge load.
+    Keys are left to the loader. Returns the number of indexes checked.
+    """
+    postgres = conn.dialect.name == 'postgresql'
+    count = 0
+    for table in tables or STAR_INDEXES:
+        if not conn.dialect.has_table(conn, table):
+            continue
+        columns = {c['name'] for c in conn.dialect.get_columns(conn, table)}
+        for kind, cols in STAR_INDEXES.get(table, []):
+            if kind not in ('index', 'brin') or not set(cols) <= columns:
+                continue
+            using = ' USING brin' if kind == 'brin' and postgres else ''
+            col_list = ', '.join(_q(c) for c in cols)
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {_q(_index_name(table, kind, cols))} '
+                              f'ON {_q(table)}{using} ({col_list})'))
+            count += 1
+    return count
+
+
+def ensure_foreign_keys(conn, fact=FACT_TABLE):
+    """
+    Fact -> dimension foreign keys (Postgres only; other databases cannot add them to an existing
+    table). A table swap drops the constraints of the table it replaces, so they are re-added after
+    every load: NOT VALID first, then validated without blocking readers. Dangling keys leave the
+    constraint NOT VALID with a warning instead of failing the load. Returns the number in place.
+    """
+    if conn.dialect.name != 'postgresql' or not conn.dialect.has_table(conn, fact):
+        return 0
+    existing = {tuple(fk['constrained_columns']) for fk in inspect(conn).get_foreign_keys(fact)}
+    count = 0
+    for col, dim in STAR_FOREIGN_KEYS.items():
+        if (col,) in existing:
+            count += 1
+            continue
+        if not conn.dialect.has_table(conn, dim):
+            continue
+        name = f'{fact}_{col.lower()}_fkey'
+        try:
+            with conn.begin_nested():
+                conn.execute(text(f'ALTER TABLE {_q(fact)} ADD CONSTRAINT {_q(name)} FOREIGN KEY ({_q(col)}) '
+                                  f'REFERENCES {_q(dim)} ({_q(col)}) NOT VALID'))
+        except DBAPIError as e:
+            print(f"⚠️ {fact}.{col}: no foreign key to {dim} ({type(e.orig).__name__})")
+            continue
+        count += 1
+        try:
+            with conn.begin_nested():
+                conn.execute(text(f'ALTER TABLE {_q(fact)} VALIDATE CONSTRAINT {_q(name)}'))
+        except DBAPIError:
+            print(f"⚠️ {fact}.{col}: keys missing from {dim}; foreign key kept NOT VALID")
+    return count
+
+
+def relation_kind(conn, name):
+    """'table', 'view', 'materialized' or None for what `name` currently is in the warehouse."""
+    if conn.dialect.name == 'postgresql':
+        kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :n AND pg_table_is_visible(oid)"),
+                            {"n": name}).scalar()
+        return {'r': 'table', 'p': 'table', 'v': 'view', 'm': 'materialized'}.get(kind)
+    if conn.dialect.name == 'sqlite':
+        return conn.execute(text("SELECT type FROM sqlite_master WHERE name = :n AND type IN ('table', 'view')"),
+                            {"n": name}).scalar()
+    inspector = inspect(conn)
+    if name in inspector.get_view_names():
+        return 'view'
+    try:
+        if name in inspector.get_materialized_view_names():
+            return 'materialized'
+    except NotImplementedError:
+        pass
+    return 'table' if inspector.has_table(name) else None
+
+
+def drop_relation(conn, name):
+    """Drop the table or (materialized) view `name`, with whatever depends on it on Postgres."""
+    kind = relation_kind(conn, name)
+    if kind is None:
+        return None
+    keyword = {'table': 'TABLE', 'view': 'VIEW', 'materialized': 'MATERIALIZED VIEW'}[kind]
+    cascade = ' CASCADE' if conn.dialect.name == 'postgresql' else ''
+    conn.execute(text(f'DROP {keyword} IF EXISTS {_q(name)}{cascade}'))
+    return kind
+
+
+def refresh_aggregates(engine, views=None):
+    """
+    Create the AGGREGATE_VIEWS that are missing (a replace load drops them with the old fact table)
+    and refresh the existing materialized ones CONCURRENTLY, so readers keep the previous rollup
+    until the new one is ready. Returns {view: 'created' | 'refreshed' | 'view'}.
+    """
+    views = AGGREGATE_VIEWS if views is None else views
+    postgres = engine.dialect.name == 'postgresql'
+    done = {}
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        for name, view in views.items():
+            if not all(engine.dialect.has_table(conn, t) for t in view['tables']):
+                continue
+            if not postgres:
+                conn.execute(text(f'CREATE VIEW IF NOT EXISTS {_q(name)} AS {view["sql"]}'))
+                done[name] = 'view'
+                continue
+            if not view.get('materialized', True):
+                conn.execute(text(f'CREATE OR REPLACE VIEW {_q(name)} AS {view["sql"]}'))
+                done[name] = 'view'
+                continue
+            exists = conn.execute(text("SELECT 1 FROM pg_matviews WHERE matviewname = :v"), {"v": name}).scalar()
+            if exists:
+                conn.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {_q(name)}'))
+                done[name] = 'refreshed'
+            else:
+                key_list = ', '.join(_q(c) for c in view['keys'])
+                conn.execute(text(f'CREATE MATERIALIZED VIEW {_q(name)} AS {view["sql"]}'))
+                conn.execute(text(f'CREATE UNIQUE INDEX {_q(name + "_key")} ON {_q(name)} ({key_list})'))
+                done[name] = 'created'
+    return done
+
+
+def apply_physical_design(engine, tables=None):
+    """
+    Run after every warehouse load: secondary indexes, fact foreign keys, planner statistics for the
+    freshly loaded tables, then the aggregate views. Primary keys and the natural-key unique indexes
+    are built by the loader itself on the staging table (WarehouseLoader.STAR_INDEXES).
+    """
+    tables = list(tables or STAR_INDEXES)
+    with engine.begin() as conn:
+        indexes = ensure_indexes(conn, tables)
+        fks = ensure_foreign_keys(conn)
+        existing = set(inspect(conn).get_table_names())  # tables only: views have no statistics
+        for table in tables:
+            if table in existing:
+                conn.execute(text(f'ANALYZE {_q(table)}'))
+    views = refresh_aggregates(engine)
+    print(f"🏗️ Physical design: {indexes} indexes, {fks} foreign keys, "
+          + (', '.join(f'{v} {state}' for v, state in views.items()) or 'no aggregate views'))
+    return {'indexes': indexes, 'foreign_keys': fks, 'views': views}
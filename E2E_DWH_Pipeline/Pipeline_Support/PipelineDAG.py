@@ -0,0 +1,290 @@
+# Pipeline_Support/PipelineDAG.py
+import os
+import glob
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import inspect
+import functools
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+
+
+BASE_DIR = os.path.dirname(__file__)
+DAG_CACHE_DIR = os.getenv('DWH_DAG_CACHE_DIR', os.path.join(os.path.dirname(BASE_DIR), '.cache', 'dag'))
+CHECKPOINT_PATH = os.getenv('DWH_DAG_CHECKPOINT_PATH', os.path.join(os.path.dirname(BASE_DIR), '.state', 'dag_checkpoint.json'))
+# cached results kept per stage (older fingerprints are pruned)
+KEEP_PER_STAGE = 3
+
+
+# A named step of the pipeline. func is called with its inputs (artifacts produced by other stages)
+# and its params (names looked up in the run's params) as keyword arguments and returns its outputs:
+# the value itself for one output, a tuple for several, anything (ignored) for none.
+# Non-cacheable stages (extraction, loads, anything with side effects) always run, and their outputs
+# are not written to the cache (downstream stages only see their content fingerprints).
+Stage = namedtuple('Stage', ['name', 'func', 'inputs', 'outputs', 'params', 'cacheable'],
+                   defaults=((), (), (), True))
+
+
+def _sha1(*parts):
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def value_fingerprint(value):
+    """Content fingerprint of an artifact: frames are hashed row-wise, dicts/lists element-wise."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        try:
+            rows = pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes()
+        except TypeError:  # unhashable cells (lists, dicts)
+            rows = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = (list(value.columns), list(map(str, value.dtypes))) if isinstance(value, pd.DataFrame) else (value.name, str(value.dtype))
+        return _sha1(type(value).__name__, meta, rows)
+    if isinstance(value, dict):
+        return _sha1('dict', *(f'{k}={value_fingerprint(v)}' for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))))
+    if isinstance(value, (list, tuple)):
+        return _sha1(type(value).__name__, *(value_fingerprint(v) for v in value))
+    try:
+        return _sha1(type(value).__name__, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return _sha1(type(value).__name__, repr(value))
+
+
+@functools.lru_cache(maxsize=None)
+def _package_source_hash(directory):
+    files = sorted(glob.glob(os.path.join(directory, '*.py')))
+    return _sha1(*(open(f, 'rb').read() for f in files))
+
+
+def code_fingerprint(func):
+    """The stage function's source plus the sources of the package it lives in (the helpers it calls)."""
+    target = getattr(func, 'func', func)  # functools.partial
+    try:
+        source = inspect.getsource(target)
+        directory = os.path.dirname(inspect.getsourcefile(target))
+        return _sha1(source, _package_source_hash(directory))
+    except (OSError, TypeError):
+        return _sha1(getattr(target, '__qualname__', repr(target)))
+
+
+def stage_fingerprint(stage, params, input_fps):
+    """Stage name + code + its params + the fingerprints of its inputs (so changes propagate downstream)."""
+    own = {p: params.get(p) for p in stage.params}
+    return _sha1(stage.name, code_fingerprint(stage.func), json.dumps(own, sort_keys=True, default=str),
+                 *(f'{i}={input_fps[i]}' for i in stage.inputs))
+
+
+def _validate(stages):
+    producers = {}
+    for st in stages:
+        for out in st.outputs:
+            if out in producers:
+                raise ValueError(f"Output '{out}' is produced by both '{producers[out]}' and '{st.name}'")
+            producers[out] = st.name
+    names = [st.name for st in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Stage names must be unique")
+    for st in stages:
+        missing = [i for i in st.inputs if i not in producers]
+        if missing:
+            raise ValueError(f"Stage '{st.name}' needs {missing}, which no stage produces")
+    return producers
+
+
+def _upstream(stages, producers, names):
+    """The named stages (or producers of named outputs) and everything they depend on."""
+    by_name = {st.name: st for st in stages}
+    todo = [producers.get(n, n) for n in names]
+    seen = set()
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        if name not in by_name:
+            raise ValueError(f"Unknown stage or output '{name}'")
+        seen.add(name)
+        todo.extend(producers[i] for i in by_name[name].inputs)
+    return seen
+
+
+# ---------- cache and checkpoint ----------
+
+def _cache_path(stage_name, fingerprint, cache_dir):
+    return os.path.join(cache_dir, stage_name, f'{fingerprint}.pkl')
+
+
+def _cache_load(stage_name, fingerprint, cache_dir):
+    path = _cache_path(stage_name, fingerprint, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except Exception:
+        return None
+    os.utime(path)
+    return entry
+
+
+def _cache_store(stage_name, fingerprint, entry, cache_dir, keep=KEEP_PER_STAGE):
+    path = _cache_path(stage_name, fingerprint, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + f'.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    old = sorted(glob.glob(os.path.join(os.path.dirname(path), '*.pkl')), key=os.path.getmtime, reverse=True)
+    for stale in old[keep:]:
+        if stale != path:
+            os.remove(stale)
+
+
+def load_checkpoint(path=None):
+    """{'run_id': ..., 'stages': {name: {'fingerprint', 'outputs', 'finished_at'}}} ({} before the first run)."""
+    p = path or CHECKPOINT_PATH
+    if not os.path.exists(p):
+        return {}
+    with open(p) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(state, path=None):
+    p = path or CHECKPOINT_PATH
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, p)
+
+
+# ---------- executor ----------
+
+def _call(stage, artifacts, params):
+    kwargs = {i: artifacts[i] for i in stage.inputs}
+    kwargs.update({p: params.get(p) for p in stage.params})
+    result = stage.func(**kwargs)
+    if len(stage.outputs) == 1:
+        return {stage.outputs[0]: result}
+    if not stage.outputs:
+        return {}
+    return dict(zip(stage.outputs, result))
+
+
+def _execute(stage, fingerprint, artifacts, params, cache_dir, reuse):
+    """Run one stage (or take its cached result). Returns (outputs, output fingerprints, cached?)."""
+    if reuse:
+        entry = _cache_load(stage.name, fingerprint, cache_dir)
+        if entry is not None:
+            return entry['outputs'], entry['fingerprints'], True
+    print(f"▶️ Stage '{stage.name}' running...")
+    start = time.perf_counter()
+    outputs = _call(stage, artifacts, params)
+    if stage.cacheable:
+        # derived from the stage fingerprint, so nothing large is hashed for deterministic stages
+        fps = {out: _sha1(fingerprint, out) for out in outputs}
+    else:
+        # content hashes let downstream stages hit the cache when e.g. a re-extract returns the same rows
+        fps = {out: value_fingerprint(value) for out, value in outputs.items()}
+    if stage.cacheable:
+        _cache_store(stage.name, fingerprint, {'outputs': outputs, 'fingerprints': fps}, cache_dir)
+    print(f"✅ Stage '{stage.name}' done in {time.perf_counter() - start:.2f}s")
+    return outputs, fps, False
+
+
+def run_dag(stages, params=None, targets=None, only=None, resume=False, max_workers=4,
+            cache_dir=None, checkpoint_path=None):
+    """
+    Run a pipeline of Stages, each one as soon as its inputs exist, independent stages concurrently
+    on a thread pool (max_workers).
+    - A cacheable stage whose fingerprint (code, params, input fingerprints) matches a cached result
+      is not run again; its outputs come from DAG_CACHE_DIR.
+    - targets: stage or output names; only these and what they depend on are run.
+    - only: stage name(s) to run on their own, with inputs taken from the last checkpoint;
+      non-cacheable stages upstream of them keep nothing on disk and run again.
+    - resume: continue the last run after a failure; cacheable stages it completed are reused,
+      non-cacheable ones run again.
+    Every completed stage is recorded in the checkpoint, so a failure keeps the work done so far.
+    Returns {output name: value} for every artifact produced or loaded.
+    """
+    params = params or {}
+    cache_dir = cache_dir or DAG_CACHE_DIR
+    producers = _validate(stages)
+    by_name = {st.name: st for st in stages}
+    state = load_checkpoint(checkpoint_path)
+    done_before = state.get('stages', {})
+    artifacts, fps = {}, {}
+
+    if only is not None:
+        selected = [only] if isinstance(only, str) else list(only)
+        run_names, force, loaded = set(selected), set(selected), set()
+        # upstream artifacts of the selected stages come from the stages recorded in the checkpoint;
+        # non-cacheable producers are run again (and so are their own inputs' producers)
+        todo = [producers[i] for name in selected for i in by_name[name].inputs]
+        while todo:
+            name = todo.pop()
+            if name in run_names or name in loaded:
+                continue
+            if not by_name[name].cacheable:
+                run_names.add(name)
+                todo.extend(producers[i] for i in by_name[name].inputs)
+                continue
+            loaded.add(name)
+            record = done_before.get(name)
+            entry = record and _cache_load(name, record['fingerprint'], cache_dir)
+            if entry is None:
+                raise RuntimeError(f"Stage '{name}' has no checkpointed result; run the pipeline (or that stage) first")
+            artifacts.update(entry['outputs'])
+            fps.update(entry['fingerprints'])
+    else:
+        run_names = _upstream(stages, producers, targets) if targets is not None else set(by_name)
+        force = set()
+        if not resume:
+            state = {'run_id': uuid.uuid4().hex, 'stages': {}}
+            _save_checkpoint(state, checkpoint_path)
+            done_before = {}
+    state.setdefault('run_id', uuid.uuid4().hex)
+    state.setdefault('stages', {})
+
+    pending = [st for st in stages if st.name in run_names]
+    running, ran, reused, error = {}, [], [], None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            if error is None:
+                for st in [st for st in pending if all(i in fps for i in st.inputs)]:
+                    pending.remove(st)
+                    fp = stage_fingerprint(st, params, fps)
+                    reuse = st.name not in force and st.cacheable
+                    inputs = {i: artifacts[i] for i in st.inputs}
+                    running[pool.submit(_execute, st, fp, inputs, params, cache_dir, reuse)] = (st, fp)
+            if not running:
+                if error is None and pending:
+                    raise ValueError(f"Stages {[st.name for st in pending]} can never run (dependency cycle)")
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                st, fp = running.pop(future)
+                try:
+                    outputs, out_fps, cached = future.result()
+                except Exception as exc:
+                    print(f"❌ Stage '{st.name}' failed: {exc}")
+                    error = error or exc
+                    continue
+                artifacts.update(outputs)
+                fps.update(out_fps)
+                (reused if cached else ran).append(st.name)
+                if cached:
+                    print(f"♻️ Stage '{st.name}': reusing cached result ({fp[:8]})")
+                state['stages'][st.name] = {'fingerprint': fp, 'outputs': out_fps, 'finished_at': time.time()}
+                _save_checkpoint(state, checkpoint_path)
+
+    if error is not None:
+        print(f"💾 DAG: {len(state['stages'])} completed stages checkpointed; rerun with resume=True to continue")
+        raise error
+    print(f"🧩 DAG: {len(ran)} stages run, {len(reused)} reused from cache")
+    return artifacts
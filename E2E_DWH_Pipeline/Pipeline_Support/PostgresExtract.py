@@ -0,0 +1,117 @@
+# Pipeline_Support/PostgresExtract.py
+import tempfile
+import threading
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+
+DEFAULT_CHUNKSIZE = 50000
+# COPY output is spooled in memory up to this size, then on disk
+COPY_SPOOL_BYTES = 64 * 1024 * 1024
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(db_name=None, user=None, password=None, host="localhost", port=5432, url=None,
+               pool_size=5, max_overflow=5):
+    """
+    Return a pooled SQLAlchemy engine, created once per connection url and reused afterwards.
+    Pass url directly (e.g. "sqlite:///stand_in.db") to point the extractor at another database.
+    """
+    url = url or f"postgresql://{user}:{password}@{host}:{port}/{db_name}"
+    with _ENGINES_LOCK:
+        if url not in _ENGINES:
+            kwargs = {'pool_pre_ping': True}
+            if url.startswith('postgresql'):
+                kwargs.update(pool_size=pool_size, max_overflow=max_overflow)
+            _ENGINES[url] = create_engine(url, **kwargs)
+        return _ENGINES[url]
+
+
+def dispose_engines():
+    """Close every pooled connection (e.g. at the end of a notebook session)."""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def _select_sql(table, columns=None, since=None, placeholder=':since'):
+    cols = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+    query = f'SELECT {cols} FROM "{table}"'
+    if since is not None:
+        operator = since[2] if len(since) > 2 else '>'
+        query += f' WHERE "{since[0]}" {operator} {placeholder}'
+    return query
+
+
+def _supports_copy(engine):
+    return engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+
+
+def _stream_copy(engine, query, chunksize, params=None, dtype=None, parse_dates=None):
+    """Run COPY (query) TO STDOUT into a spooled buffer and parse it back in chunks."""
+    raw = engine.raw_connection()
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_BYTES, mode='w+b') as spool:
+            cur = raw.cursor()
+            if params:
+                # COPY takes no bind parameters, so let the driver inline them safely
+                query = cur.mogrify(query, params).decode()
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", spool)
+            cur.close()
+            raw.commit()
+            spool.seek(0)
+            for chunk in pd.read_csv(spool, chunksize=chunksize, dtype=dtype, parse_dates=parse_dates):
+                yield chunk
+    finally:
+        raw.close()
+
+
+def _stream_cursor(engine, query, chunksize, params=None, dtype=None, parse_dates=None):
+    """Pull rows through a server-side cursor (plain chunked fetch on backends without one)."""
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        for chunk in pd.read_sql(text(query), conn, params=params, chunksize=chunksize,
+                                 dtype=dtype, parse_dates=parse_dates):
+            yield chunk
+
+
+def stream_table(engine, table, chunksize=DEFAULT_CHUNKSIZE, method="auto", columns=None, since=None,
+                 dtype=None, parse_dates=None):
+    """
+    Generator yielding a table as DataFrame chunks of at most chunksize rows.
+    method:
+      - "copy"   = COPY ... TO STDOUT (PostgreSQL + psycopg2 only), parsed chunk by chunk
+      - "cursor" = server-side cursor via read_sql(chunksize=...)
+      - "auto"   = "copy" when the engine supports it, else "cursor" (e.g. a SQLite stand-in)
+    since: optional (column, value[, operator]); only rows with column > value (or the given
+      operator, e.g. '>=') are extracted.
+    dtype / parse_dates type the columns while each chunk is parsed (see SourceSchemas.read_options).
+    """
+    if method == "auto":
+        method = "copy" if _supports_copy(engine) else "cursor"
+    if method == "copy":
+        if not _supports_copy(engine):
+            raise ValueError("COPY extraction needs a PostgreSQL engine using psycopg2.")
+        query = _select_sql(table, columns, since, placeholder='%(since)s')
+        params = {'since': since[1]} if since is not None else None
+        yield from _stream_copy(engine, query, chunksize, params, dtype, parse_dates)
+    elif method == "cursor":
+        query = _select_sql(table, columns, since)
+        params = {'since': since[1]} if since is not None else None
+        yield from _stream_cursor(engine, query, chunksize, params, dtype, parse_dates)
+    else:
+        raise ValueError("Invalid method. Use 'auto', 'copy' or 'cursor'.")
+
+
+def read_table(engine, table, chunksize=DEFAULT_CHUNKSIZE, method="auto", columns=None, since=None,
+               dtype=None, parse_dates=None):
+    """Read a whole table (or its rows after since) through stream_table and return one DataFrame."""
+    chunks = list(stream_table(engine, table, chunksize=chunksize, method=method, columns=columns, since=since,
+                               dtype=dtype, parse_dates=parse_dates))
+    if not chunks:
+        return pd.DataFrame(columns=columns or [])
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
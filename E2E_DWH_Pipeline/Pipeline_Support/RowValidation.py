@@ -0,0 +1,98 @@
+# Pipeline_Support/RowValidation.py
+import numpy as np
+import pandas as pd
+from .SourceSchemas import SCHEMA_REGISTRY, PRIMARY_KEYS
+
+
+def _is_text(series):
+    return (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype))
+
+
+def header_row_mask(df):
+    """
+    Rows that repeat the header: every text value equals some column name (case-insensitive).
+    On typed frames such a row has lost its numeric and date values to NA, so those columns
+    must be empty; at least one text column has to match.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    names = {str(c).strip().lower() for c in df.columns}
+    text = [c for c in df.columns if _is_text(df[c])]
+    if not text:
+        return np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        s = df[col]
+        if col in text:
+            mask &= s.astype(str).str.strip().str.lower().isin(names).to_numpy()
+        else:
+            mask &= s.isna().to_numpy()
+        if not mask.any():
+            break
+    return mask
+
+
+def scrub_rows(df, table=None):
+    """
+    Vectorized row validation for one table (or one chunk of it).
+    Drops repeated header rows, rows with no values at all and rows with a missing primary key,
+    and counts values that do not parse as the numeric type the DDL expects.
+    Returns (clean_df, counts dict).
+    """
+    counts = {'rows': len(df), 'header_rows': 0, 'empty_rows': 0, 'missing_key': 0, 'bad_values': 0}
+    if df.empty:
+        return df, counts
+
+    header = header_row_mask(df)
+    empty = df.isna().all(axis=1).to_numpy()
+    counts['header_rows'] = int(header.sum())
+    counts['empty_rows'] = int((empty & ~header).sum())
+    drop = header | empty
+    clean = df[~drop].reset_index(drop=True) if drop.any() else df
+
+    if table is not None:
+        keys = [k for k in PRIMARY_KEYS.get(table.lower(), []) if k in clean.columns]
+        if keys:
+            keyless = clean[keys].isna().any(axis=1).to_numpy()
+            counts['missing_key'] = int(keyless.sum())
+            if keyless.any():
+                clean = clean[~keyless].reset_index(drop=True)
+        for col, dtype in SCHEMA_REGISTRY.get(table.lower(), {}).items():
+            if col in clean.columns and dtype in ('Int32', 'Int64', 'float64') and _is_text(clean[col]):
+                s = clean[col]
+                counts['bad_values'] += int((pd.to_numeric(s, errors='coerce').isna() & s.notna()).sum())
+    return clean, counts
+
+
+def _add_counts(total, counts):
+    for k, v in counts.items():
+        total[k] = total.get(k, 0) + v
+    return total
+
+
+def scrub_chunks(chunks, table=None, report=None):
+    """
+    Apply scrub_rows to a stream of chunks (e.g. PostgresExtract.stream_table) and yield the clean
+    chunks. Counts are accumulated into report[table] when a report dict is passed.
+    """
+    for chunk in chunks:
+        clean, counts = scrub_rows(chunk, table)
+        if report is not None:
+            _add_counts(report.setdefault(table, {}), counts)
+        yield clean
+
+
+def print_scrub_report(name, counts):
+    issues = {k: v for k, v in counts.items() if k != 'rows' and v}
+    if issues:
+        print(f"🧹 {name}: " + ', '.join(f"{v} {k.replace('_', ' ')}" for k, v in issues.items()))
+
+
+def scrub_tables(dataframes, report=None):
+    """scrub_rows over a dict of tables; prints one line per table that needed cleaning."""
+    report = report if report is not None else {}
+    for name, df in list(dataframes.items()):
+        clean, counts = scrub_rows(df, name)
+        dataframes[name] = clean
+        report[name] = counts
+        print_scrub_report(name, counts)
+    return dataframes, report
@@ -0,0 +1,174 @@
+# Pipeline_Support/SourceSchemas.py
+import os
+import re
+import hashlib
+import pandas as pd
+
+
+BASE_DIR = os.path.dirname(__file__)
+DDL_PATH = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), 'Database', 'DDLQueries new.sql')
+
+# Low-cardinality text columns held as categoricals instead of one Python string per row
+CATEGORICAL_COLUMNS = {
+    'address': ['state'],
+    'agent': ['agent_gender', 'title'],
+    'client': ['client_gender'],
+    'owner': ['owner_gender'],
+    'property': ['listing_type'],
+    'maintenance': ['maintenance_type'],
+    'commission': ['payment_method'],
+}
+
+
+def _read_ddl(ddl_path=None):
+    p = ddl_path or DDL_PATH
+    if not os.path.exists(p):
+        return ''
+    with open(p) as f:
+        return f.read()
+
+
+def _create_table_bodies(ddl):
+    return re.findall(r'CREATE\s+TABLE\s+"?(\w+)"?\s*\((.*?)\);', ddl, flags=re.IGNORECASE | re.DOTALL)
+
+
+def load_primary_keys(ddl_path: str = None) -> dict:
+    """Parse CREATE TABLE statements in the DDL and return {table_name (lowercase): [pk columns]}."""
+    keys = {}
+    for table, body in _create_table_bodies(_read_ddl(ddl_path)):
+        table_level = re.search(r'PRIMARY\s+KEY\s*\(([^)]*)\)', body, flags=re.IGNORECASE)
+        if table_level:
+            cols = [c.strip().strip('"').lower() for c in table_level.group(1).split(',')]
+        else:
+            cols = [c.lower() for c in re.findall(r'^\s*"?(\w+)"?\s+[\w()]+[^,\n]*\bPRIMARY\s+KEY', body,
+                                                  flags=re.IGNORECASE | re.MULTILINE)]
+        if cols:
+            keys[table.lower()] = cols
+    return keys
+
+
+def load_foreign_keys(ddl_path: str = None) -> dict:
+    """Parse column-level REFERENCES clauses: {table (lowercase): {column: (referenced table, referenced column)}}."""
+    keys = {}
+    for table, body in _create_table_bodies(_read_ddl(ddl_path)):
+        refs = re.findall(r'^\s*"?(\w+)"?\s+[^,\n]*?\bREFERENCES\s+"?(\w+)"?\s*\(\s*"?(\w+)"?\s*\)', body,
+                          flags=re.IGNORECASE | re.MULTILINE)
+        if refs:
+            keys[table.lower()] = {col.lower(): (ref.lower(), ref_col.lower()) for col, ref, ref_col in refs}
+    return keys
+
+
+def load_column_types(ddl_path: str = None) -> dict:
+    """Parse the DDL into {table_name (lowercase): {column: SQL type (upper case, no size)}}."""
+    tables = {}
+    for table, body in _create_table_bodies(_read_ddl(ddl_path)):
+        cols = {}
+        for col, sql_type in re.findall(r'^\s*"?(\w+)"?\s+([A-Za-z]+)', body, flags=re.MULTILINE):
+            if col.upper() in ('PRIMARY', 'FOREIGN', 'UNIQUE', 'CONSTRAINT', 'CHECK'):
+                continue
+            cols[col.lower()] = sql_type.upper()
+        tables[table.lower()] = cols
+    return tables
+
+
+def _pandas_dtype(sql_type):
+    # Postgres INT/SERIAL are 32 bit; nullable so missing ids survive until imputation
+    if sql_type in ('SERIAL', 'INT', 'INTEGER', 'SMALLINT'):
+        return 'Int32'
+    if sql_type in ('BIGSERIAL', 'BIGINT'):
+        return 'Int64'
+    if sql_type in ('NUMERIC', 'DECIMAL', 'REAL', 'FLOAT', 'DOUBLE'):
+        return 'float64'
+    if sql_type in ('DATE', 'TIMESTAMP'):
+        return 'datetime64[ns]'
+    # free text keeps pandas' own string handling
+    return None
+
+
+def build_registry(ddl_path: str = None) -> dict:
+    """Return {table: {column: pandas dtype}} derived from the DDL plus CATEGORICAL_COLUMNS."""
+    registry = {}
+    for table, cols in load_column_types(ddl_path).items():
+        dtypes = {col: _pandas_dtype(t) for col, t in cols.items() if _pandas_dtype(t) is not None}
+        for col in CATEGORICAL_COLUMNS.get(table, []):
+            if col in cols:
+                dtypes[col] = 'category'
+        registry[table] = dtypes
+    return registry
+
+
+SCHEMA_REGISTRY = build_registry()
+PRIMARY_KEYS = load_primary_keys()
+FOREIGN_KEYS = load_foreign_keys()
+# Changes whenever the DDL (or the categorical list) changes; part of extract cache keys
+SCHEMA_VERSION = hashlib.sha1(repr(sorted(SCHEMA_REGISTRY.items())).encode('utf-8')).hexdigest()[:12]
+
+
+def date_columns(table):
+    return [c for c, t in SCHEMA_REGISTRY.get(table.lower(), {}).items() if t.startswith('datetime')]
+
+
+def read_options(table, columns=None):
+    """
+    Keyword arguments for read_csv / read_sql that type a table's columns while it is parsed:
+    {'dtype': {...}, 'parse_dates': [...]}. Columns not in the DDL are left to pandas.
+    """
+    schema = SCHEMA_REGISTRY.get(table.lower(), {})
+    if columns is not None:
+        schema = {c: t for c, t in schema.items() if c in columns}
+    return {
+        'dtype': {c: t for c, t in schema.items() if not t.startswith('datetime')},
+        'parse_dates': [c for c, t in schema.items() if t.startswith('datetime')],
+    }
+
+
+def read_csv_typed(source, table, **kwargs):
+    """
+    read_csv with the table's registry types applied during parsing. Source files mix date
+    formats (1/27/2021 vs 2023-05-11), so dates are parsed with format='mixed'.
+    Dirty files whose values do not fit the types are read untyped, stripped of repeated header
+    lines while the values are still text, and then coerced once.
+    """
+    opts = read_options(table)
+    try:
+        df = pd.read_csv(source, dtype=opts['dtype'], parse_dates=opts['parse_dates'], date_format='mixed', **kwargs)
+    except (ValueError, TypeError):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        from .RowValidation import header_row_mask
+        df = pd.read_csv(source, **kwargs)
+        header = header_row_mask(df)
+        if header.any():
+            print(f"🧹 {table}: {int(header.sum())} header rows")
+            df = df[~header].reset_index(drop=True)
+        return apply_schema(df, table)
+    # parse_dates leaves a column as text when some value is not a date
+    for col in opts['parse_dates']:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format='mixed', errors='coerce')
+    return df
+
+
+def apply_schema(df, table):
+    """
+    Coerce an already loaded frame (Mockaroo JSON, untyped fallbacks) to the registry types.
+    Columns that already have the right dtype are left untouched.
+    """
+    schema = SCHEMA_REGISTRY.get(table.lower(), {})
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if dtype.startswith('datetime'):
+            if not pd.api.types.is_datetime64_any_dtype(s):
+                df[col] = pd.to_datetime(s, format='mixed', errors='coerce')
+        elif dtype in ('Int32', 'Int64'):
+            if str(s.dtype) != dtype:
+                numeric = pd.to_numeric(s, errors='coerce')
+                df[col] = numeric.round().astype(dtype)
+        elif dtype == 'float64':
+            if not pd.api.types.is_float_dtype(s):
+                df[col] = pd.to_numeric(s, errors='coerce').astype('float64')
+        elif str(s.dtype) != dtype:
+            df[col] = s.astype(dtype)
+    return df
@@ -0,0 +1,238 @@
+# Pipeline_Support/StageBenchmark.py
+import os
+import time
+import uuid
+import tempfile
+import tracemalloc
+import subprocess
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from . import ML_Tech
+from .ETL_SupportFunctions import (
+    fetch_datasets, fill_mv, correct_dtypes, knn_impute, create_star_schema, create_fact_trans, build_date_dim,
+    create_loc_dim, create_agent_dim, create_propdet_dim, create_listing_dim
+)
+from .ETL_MasterFunction import SOURCE_TABLES
+from .FactAssembly import assemble_fact_trans
+from .FactSnapshot import gather_fact_snapshot
+from .DataScaler import DATASETS_DIR, scale_datasets
+
+
+BASE_DIR = os.path.dirname(__file__)
+BENCHMARK_PATH = os.getenv('DWH_BENCHMARK_PATH', os.path.join(os.path.dirname(BASE_DIR), '.state', 'stage_benchmarks.csv'))
+DEFAULT_SCALES = (1, 10, 50)
+# time growth per data growth above this exponent (1 = linear) is flagged as a scaling cliff
+SUPERLINEAR_EXPONENT = 1.3
+START_DATE, END_DATE = '2022-01-01', '2025-12-31'
+
+
+def measure(fn, repeat=1, memory=True):
+    """
+    Run fn() `repeat` times; returns (last result, best wall time in s, peak traced allocation in MB).
+    The memory pass runs once more under tracemalloc, apart from the timed runs it would slow down.
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = np.nan
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return result, best, peak
+
+
+def _copy(frames):
+    return {name: df.copy() for name, df in frames.items()}
+
+
+def _snapshot(star):
+    # the create_fact_snapshot join, without its file and database writes
+    return gather_fact_snapshot(*star)
+
+
+def _fact_inputs(t):
+    dims = dict(dimdate=build_date_dim(t['sale'], t['rent'], START_DATE, END_DATE), dimloc=create_loc_dim(t['address']),
+                dimagent=create_agent_dim(t['agent']), dimprodet=create_propdet_dim(t['features']),
+                dimlisting=create_listing_dim(t['property'], t['visit']))
+    return dict(sale=t['sale'], rent=t['rent'], maintenance=t['maintenance'], property=t['property'],
+                commission=t['commission'], visit=t['visit'], start_date=START_DATE, end_date=END_DATE, **dims)
+
+
+def _dimquery(star):
+    from .DimensionalQueries import dimquery  # needs pandasql
+    return dimquery(*star)
+
+
+@contextlib.contextmanager
+def _ml_outputs_to(directory):
+    # ML_Tech writes its CSVs and models next to the real snapshot; benchmark runs go elsewhere
+    saved = ML_Tech.OUTPUT_DIR, ML_Tech.MODELS_DIR
+    ML_Tech.OUTPUT_DIR = ML_Tech.MODELS_DIR = directory
+    try:
+        yield
+    finally:
+        ML_Tech.OUTPUT_DIR, ML_Tech.MODELS_DIR = saved
+
+
+def stage_plan():
+    """
+    (stage, input artifact, function) in pipeline order. Each function gets the named artifact
+    and its result becomes the artifact named after the stage.
+    """
+    return [
+        ('fill_mv', 'raw', lambda d: fill_mv(_copy(d))),
+        ('correct_dtypes', 'fill_mv', lambda d: correct_dtypes(_copy(d))),
+        ('knn_impute', 'raw', lambda d: knn_impute(d['features'].copy())),
+        ('create_star_schema', 'correct_dtypes', lambda t: create_star_schema(
+            **{k: t[k] for k in ('sale', 'rent', 'maintenance', 'property', 'commission', 'visit', 'features', 'address', 'agent')},
+            start_date=START_DATE, end_date=END_DATE)),
+        ('fact_inputs', 'correct_dtypes', _fact_inputs),
+        ('create_fact_trans', 'fact_inputs', lambda args: create_fact_trans(**args)),
+        ('assemble_fact_trans', 'fact_inputs', lambda args: assemble_fact_trans(**args)),
+        ('dimquery', 'create_star_schema', _dimquery),
+        ('fact_snapshot', 'create_star_schema', _snapshot),
+        ('compute_kpis', 'fact_snapshot', ML_Tech.compute_kpis),
+        ('generate_trend_data', 'fact_snapshot', ML_Tech.generate_trend_data),
+        ('cluster_properties', 'fact_snapshot', ML_Tech.cluster_properties),
+        ('detect_anomalies', 'fact_snapshot', ML_Tech.detect_anomalies),
+        ('train_price_model', 'fact_snapshot', ML_Tech.train_price_model),
+    ]
+
+
+def _required(stages):
+    """The named stages plus every stage whose result they read."""
+    sources = {name: source for name, source, _ in stage_plan()}
+    needed = set()
+    for name in stages:
+        while name in sources and name not in needed:
+            needed.add(name)
+            name = sources[name]
+    return needed
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _rows(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[-1], pd.DataFrame):
+        return len(result[-1])
+    if isinstance(result, dict) and 'sale' in result:
+        return len(result['sale'])
+    return None
+
+
+def benchmark_stages(scales=DEFAULT_SCALES, datasets=None, stages=None, repeat=2, memory=True, path=None, quiet=True):
+    """
+    Time and memory-profile every pipeline stage and ML_Tech function on the sample data scaled by each
+    factor in `scales` (DataScaler.scale_datasets). Results are appended to `path` (BENCHMARK_PATH)
+    with a run id and the git commit, so runs can be compared with compare_benchmarks.
+    stages: names from stage_plan() to run (their inputs are built either way). quiet hides the
+    stages' own prints. A failing stage is recorded with its error and the stages that need it are skipped.
+    Returns the results of this run as a DataFrame.
+    """
+    base = datasets or fetch_datasets(SOURCE_TABLES, DATASETS_DIR, cache=False)
+    run_id, commit = uuid.uuid4().hex[:8], _commit()
+    needed = _required(stages) if stages is not None else None
+    results = []
+    with tempfile.TemporaryDirectory() as scratch, _ml_outputs_to(scratch):
+        for scale in scales:
+            artifacts = {'raw': scale_datasets(base, scale)}
+            sale_rows = len(artifacts['raw']['sale'])
+            for name, source, fn in stage_plan():
+                if needed is not None and name not in needed:
+                    continue
+                row = {'run_id': run_id, 'commit': commit, 'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+                       'scale': scale, 'sale_rows': sale_rows, 'stage': name, 'seconds': np.nan, 'peak_mb': np.nan,
+                       'rows_out': None, 'status': 'ok'}
+                if source not in artifacts:
+                    row['status'] = f'skipped: no {source}'
+                else:
+                    try:
+                        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                            result, row['seconds'], row['peak_mb'] = measure(lambda: fn(artifacts[source]), repeat, memory)
+                        artifacts[name] = result
+                        row['rows_out'] = _rows(result)
+                    except Exception as e:
+                        row['status'] = f'error: {type(e).__name__}: {e}'[:200]
+                results.append(row)
+                shown = row['status']
+                if row['status'] == 'ok':
+                    shown = f"{row['seconds']:.3f}s" + (f", {row['peak_mb']:.1f} MB" if not np.isnan(row['peak_mb']) else "")
+                print(f"⏱️ x{scale:<6} {name:<22} {shown}")
+            del artifacts
+
+    df = pd.DataFrame(results)
+    out = path or BENCHMARK_PATH
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    df.to_csv(out, mode='a', header=not os.path.exists(out), index=False)
+    print_scaling_report(df)
+    return df
+
+
+def scaling_report(results):
+    """
+    Seconds per stage (rows) and scale (columns) plus the growth exponent between the two largest
+    scales: log(time ratio) / log(data ratio), 1 for linear stages, 2 for quadratic ones.
+    """
+    ok = results[results['status'] == 'ok']
+    table = ok.pivot_table(index='stage', columns='sale_rows', values='seconds', aggfunc='min', sort=False)
+    if table.shape[1] >= 2:
+        lo, hi = table.columns[-2], table.columns[-1]
+        table['exponent'] = np.log(table[hi] / table[lo]) / np.log(hi / lo)
+    return table
+
+
+def print_scaling_report(results):
+    table = scaling_report(results)
+    print("📊 Stage timings (seconds by sale rows):")
+    print(table.round(3).to_string())
+    if 'exponent' in table.columns:
+        cliffs = table.index[table['exponent'] > SUPERLINEAR_EXPONENT].tolist()
+        if cliffs:
+            print(f"⚠️ Superlinear scaling (exponent > {SUPERLINEAR_EXPONENT}): {', '.join(cliffs)}")
+
+
+def compare_benchmarks(baseline=None, current=None, path=None, threshold=1.2):
+    """
+    Compare two recorded runs (run ids; default the last two in the results file) stage by stage
+    and scale by scale. Returns the comparison and prints the stages that got slower than threshold x.
+    """
+    history = pd.read_csv(path or BENCHMARK_PATH)
+    history = history[history['status'] == 'ok']
+    runs = list(dict.fromkeys(history['run_id']))
+    if current is None:
+        current = runs[-1]
+    if baseline is None:
+        earlier = [r for r in runs if r != current]
+        if not earlier:
+            raise ValueError("Need two recorded benchmark runs to compare")
+        baseline = earlier[-1]
+    keys = ['stage', 'scale']
+    base = history[history['run_id'] == baseline].set_index(keys)[['seconds', 'peak_mb']]
+    cur = history[history['run_id'] == current].set_index(keys)[['seconds', 'peak_mb']]
+    cmp = base.join(cur, lsuffix='_baseline', rsuffix='_current', how='inner')
+    cmp['time_ratio'] = cmp['seconds_current'] / cmp['seconds_baseline']
+    cmp['memory_ratio'] = cmp['peak_mb_current'] / cmp['peak_mb_baseline']
+    slower = cmp[cmp['time_ratio'] > threshold]
+    if len(slower):
+        print(f"⚠️ Slower than {threshold}x of run {baseline}:")
+        print(slower[['seconds_baseline', 'seconds_current', 'time_ratio']].round(3).to_string())
+    else:
+        print(f"✅ No stage slower than {threshold}x of run {baseline}")
+    return cmp
@@ -0,0 +1,136 @@
+# Pipeline_Support/Staging.py
+import os
+import glob
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+BASE_DIR = os.path.dirname(__file__)
+STAGING_DIR = os.getenv('DWH_STAGING_DIR', os.path.join(os.path.dirname(BASE_DIR), 'Staging'))
+COMPRESSION = 'zstd'
+
+_ID = pa.int32()
+_STR = pa.string()
+_DIM_SCHEMAS = {
+    'Dim_Date': pa.schema([('DateID', _ID), ('Date', pa.timestamp('ns')), ('Year', pa.int16()),
+                           ('Quarter', pa.int8()), ('Month', pa.int8()), ('Week', pa.int8()), ('Day', pa.int8())]),
+    'Dim_Location': pa.schema([('LocationID', _ID), ('State', _STR), ('City', _STR), ('ZipCode', _STR)]),
+    'Dim_Agent': pa.schema([('AgentID', _ID), ('Gender', _STR), ('AgeCat', _STR), ('AgentSince', pa.int16()),
+                            ('Position', _STR)]),
+    'Dim_PropertyDetails': pa.schema([('PropertyDetailsID', _ID), ('LotArea', _ID), ('Bedrooms', pa.int16()),
+                                      ('Bathrooms', pa.int16()), ('Kitchens', pa.int16()), ('Floors', pa.int16()),
+                                      ('ParkingArea', _ID), ('BuiltSince', pa.int16()), ('Condition', _STR)]),
+    'Dim_Listing': pa.schema([('ListingID', _ID), ('ListingType', _STR), ('NumVisits', _ID)]),
+}
+_MEASURES = [('MaintenanceExp', pa.int64()), ('AskedAmount', pa.float64()), ('TransactionValue', pa.float64()),
+             ('CommissionRate', pa.float64()), ('CommissionValue', pa.float64()), ('NegotiationDays', _ID),
+             ('ClosingDays', pa.float64())]
+_FACT_SCHEMA = pa.schema([('TransactionID', pa.int64()), ('DateID', _ID), ('LocationID', _ID), ('AgentID', _ID),
+                          ('PropertyDetailsID', _ID), ('ListingID', _ID)] + _MEASURES)
+
+
+def _snapshot_schema():
+    fields = [pa.field('TransactionID', pa.int64())]
+    for dim in ['Dim_Date', 'Dim_Location', 'Dim_Agent', 'Dim_PropertyDetails', 'Dim_Listing']:
+        fields += [f for f in _DIM_SCHEMAS[dim] if not f.name.endswith('ID')]
+    fields += [pa.field(name, typ) for name, typ in _MEASURES]
+    return pa.schema(fields)
+
+
+# Typed schemas for the star-schema artifacts; raw extracts are staged with inferred types
+STAR_SCHEMAS = dict(_DIM_SCHEMAS, Fact_Transaction=_FACT_SCHEMA, Fact_Snapshot=_snapshot_schema())
+
+
+def staged_table_dir(name, area, staging_dir=None):
+    """Directory holding the part files of a staged table (<staging_dir>/<area>/<name>)."""
+    return os.path.join(staging_dir or STAGING_DIR, area, name)
+
+
+def _typed_column(series, field):
+    """Build one Arrow column with the field's type, coercing the usual CSV/pandas drift first."""
+    values = series
+    if pa.types.is_string(field.type):
+        values = series.where(series.isna(), series.astype(str))
+    elif pa.types.is_timestamp(field.type):
+        values = pd.to_datetime(series, errors='coerce')
+    elif pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+        values = pd.to_numeric(series, errors='coerce')
+    try:
+        return pa.Array.from_pandas(values, type=field.type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        print(f"⚠️ Staging: column '{field.name}' does not fit {field.type} ({e}); inferring its type instead")
+        return pa.Array.from_pandas(values)
+
+
+def to_arrow(df, schema=None):
+    """Convert a frame to Arrow, using the typed schema when one is given (extra columns are kept)."""
+    if schema is not None:
+        arrays, names = [], []
+        for c in df.columns:
+            if c in schema.names:
+                arrays.append(_typed_column(df[c], schema.field(c)))
+            else:
+                arrays.append(to_arrow(df[[c]]).column(0))
+            names.append(c)
+        return pa.Table.from_arrays(arrays, names=names)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # raw extracts can carry mixed-type object columns (e.g. stray header rows); keep them as text
+        fixed = df.copy()
+        for c in fixed.columns:
+            if fixed[c].dtype == object:
+                fixed[c] = fixed[c].where(fixed[c].isna(), fixed[c].astype(str))
+        return pa.Table.from_pandas(fixed, preserve_index=False)
+
+
+def write_staged(df, name, area='star', append=False, schema=None, csv_path=None, staging_dir=None):
+    """
+    Write a frame to the columnar staging area as compressed Parquet (STAGING_DIR/area/name/part-*.parquet).
+    - append=True adds a new part file instead of replacing the table.
+    - schema defaults to STAR_SCHEMAS[name] when the name is known.
+    - csv_path optionally writes the same frame as CSV (side output for Power BI).
+    Returns the table directory.
+    """
+    table_dir = staged_table_dir(name, area, staging_dir)
+    if not append and os.path.isdir(table_dir):
+        shutil.rmtree(table_dir)
+    os.makedirs(table_dir, exist_ok=True)
+    part = len(glob.glob(os.path.join(table_dir, 'part-*.parquet')))
+    schema = schema if schema is not None else STAR_SCHEMAS.get(name)
+    pq.write_table(to_arrow(df, schema), os.path.join(table_dir, f'part-{part:05d}.parquet'),
+                   compression=COMPRESSION)
+    if csv_path is not None:
+        if append and os.path.exists(csv_path):
+            df.to_csv(csv_path, mode='a', header=False, index=False)
+        else:
+            df.to_csv(csv_path, index=False)
+    return table_dir
+
+
+def staged_exists(name, area='star', staging_dir=None):
+    # part files sit in the table directory, or in period=... subdirectories for partitioned facts
+    table_dir = staged_table_dir(name, area, staging_dir)
+    return bool(glob.glob(os.path.join(table_dir, 'part-*.parquet')) or
+                glob.glob(os.path.join(table_dir, '*', 'part-*.parquet')))
+
+
+def read_staged(name, area='star', columns=None, filters=None, staging_dir=None):
+    """
+    Read a staged table back into pandas. Files are memory-mapped and only the requested
+    columns are decoded; filters are pyarrow row filters, e.g. [('Year', '=', 2023)].
+    """
+    table_dir = staged_table_dir(name, area, staging_dir)
+    if not staged_exists(name, area, staging_dir):
+        raise FileNotFoundError(f"No staged table '{name}' in {table_dir}")
+    table = pq.read_table(table_dir, columns=columns, filters=filters, memory_map=True)
+    return table.to_pandas()
+
+
+def stage_frames(frames, area='raw', staging_dir=None):
+    """Stage a dict of frames (e.g. the raw extracts) under their keys."""
+    for name, df in frames.items():
+        if df is not None:
+            write_staged(df, name, area=area, staging_dir=staging_dir)
@@ -0,0 +1,130 @@
+# Pipeline_Support/StreamingStarSchema.py
+import os
+import shutil
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from .ETL_SupportFunctions import (
+    coerce_table, create_loc_dim, create_agent_dim, create_propdet_dim, create_listing_dim, tidy_star_dims
+)
+from .RowValidation import scrub_rows
+from .DerivationRules import DERIVATION_RULES, apply_derivations
+from .DateDimension import ensure_date_dim
+from .FactAssembly import FactLookups, transaction_rows
+from .FactPartitions import FACT_NAME, fact_periods, _fact_dir, _partition_dir
+from .Staging import write_staged, to_arrow, STAR_SCHEMAS, COMPRESSION
+from .MemoryOptimizer import peak_rss_mb
+
+
+# Rows of sale / rent held in memory at a time
+STREAM_CHUNK_ROWS = int(os.getenv('DWH_STREAM_CHUNK_ROWS', 100_000))
+
+
+def iter_chunks(source, chunk_rows=None, columns=None):
+    """
+    Bounded-size DataFrame chunks from a frame, a CSV file, a Parquet file or directory (e.g. a
+    staged table), or an iterable that already yields frames.
+    """
+    chunk_rows = chunk_rows or STREAM_CHUNK_ROWS
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows]
+    elif isinstance(source, (str, os.PathLike)) and str(source).lower().endswith('.csv'):
+        yield from pd.read_csv(source, chunksize=chunk_rows, usecols=columns)
+    elif isinstance(source, (str, os.PathLike)):
+        for batch in ds.dataset(source, format='parquet').to_batches(columns=columns, batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from source
+
+
+def clean_chunk(name, chunk, commission=None):
+    """
+    The row-local part of the cleaning for one sale/rent chunk: scrub, type coercion and the
+    amount derivations from the commission table. Table-wide steps (duplicate removal,
+    imputation) need the whole table and are not applied; amounts that stay missing stay NaN.
+    """
+    chunk, _ = scrub_rows(chunk, name)
+    chunk = coerce_table(name, chunk.copy())
+    if commission is not None:
+        rules = [rule for rule in DERIVATION_RULES if rule[0] == name]
+        apply_derivations({name: chunk, 'commission': commission}, rules=rules, verbose=False)
+    return chunk
+
+
+def _write_fact_chunk(fact, dim_date, chunk_no, staging_dir=None):
+    periods = fact_periods(fact, dim_date)
+    schema = STAR_SCHEMAS[FACT_NAME]
+    written = set()
+    for period in pd.unique(periods):
+        path = _partition_dir(period, staging_dir)
+        os.makedirs(path, exist_ok=True)
+        part = fact[periods == period]
+        pq.write_table(to_arrow(part, schema), os.path.join(path, f'part-{chunk_no:05d}.parquet'), compression=COMPRESSION)
+        written.add(int(period))
+    return written
+
+
+def stream_star_schema(sale, rent, maintenance, property, commission, visit, features, address, agent,
+                       start_date=None, end_date=None, dim_date=None, key_registry=None,
+                       transaction_ids='source', chunk_rows=None, clean=True, staging_dir=None):
+    """
+    Out-of-core create_star_schema. The dimensions and the side tables the fact reads (property,
+    commission, maintenance, visit) are held in memory as key-indexed lookups; sale and rent are read
+    in chunks of chunk_rows (anything iter_chunks accepts) and every fact chunk goes straight to the
+    staged, year/month partitioned Fact_Transaction (STAGING_DIR/star/Fact_Transaction/period=YYYYMM/),
+    so peak memory depends on the chunk size and the lookups, not on the number of transactions.
+    - clean: run clean_chunk on each chunk (the in-memory tables are expected to be cleaned already).
+    - transaction_ids: 'source' (default) gives the stable ids FactPartitions expects; 'sequence'
+      numbers the facts 1..n across chunks in the order create_star_schema would.
+    Dim_Date is extended chunk by chunk when a date falls outside it; earlier DateIDs never move.
+    Returns (Dim_Date, Dim_Location, Dim_Agent, Dim_PropertyDetails, Dim_Listing, summary); the fact
+    can be read back with FactPartitions.read_fact_partitions.
+    """
+    dimloc = create_loc_dim(address=address, keys=key_registry)
+    dimagent = create_agent_dim(agent=agent, keys=key_registry)
+    dimprodet = create_propdet_dim(features=features)
+    dimlisting = create_listing_dim(property=property, visit=visit, keys=key_registry)
+    dimdate = dim_date
+    if dim_date is not None or start_date is not None or end_date is not None:
+        dimdate = ensure_date_dim(existing=dim_date, start_date=start_date, end_date=end_date)
+
+    lookups = None
+    shutil.rmtree(_fact_dir(staging_dir), ignore_errors=True)
+    summary = {'rows': 0, 'chunks': 0, 'max_chunk_rows': 0, 'periods': set()}
+    sources = [('sale', iter_chunks(sale, chunk_rows)), ('rent', iter_chunks(rent, chunk_rows))]
+    for name, chunks in sources:
+        for chunk in chunks:
+            if clean:
+                chunk = clean_chunk(name, chunk, commission)
+            tx = transaction_rows(chunk if name == 'sale' else None, chunk if name == 'rent' else None,
+                                  start_date, end_date)
+            summary['max_chunk_rows'] = max(summary['max_chunk_rows'], len(chunk))
+            del chunk
+            if tx.empty:
+                continue
+
+            extended = ensure_date_dim(existing=dimdate, dates=tx['Date'])
+            if lookups is None:
+                lookups = FactLookups(maintenance, property, commission, visit, extended, dimloc, dimagent, dimlisting)
+            elif len(extended) != len(dimdate):
+                lookups.set_date_dim(extended)
+            dimdate = extended
+
+            fact = lookups.assemble(tx, transaction_ids, first_id=summary['rows'] + 1)
+            summary['periods'] |= _write_fact_chunk(fact, dimdate, summary['chunks'], staging_dir)
+            summary['rows'] += len(fact)
+            summary['chunks'] += 1
+
+    if dimdate is None:
+        raise ValueError("stream_star_schema needs a date range, a Dim_Date or at least one transaction")
+    dims = tidy_star_dims(dimdate, dimloc, dimagent, dimprodet, dimlisting)
+    for dim_name, df in zip(['Dim_Date', 'Dim_Location', 'Dim_Agent', 'Dim_PropertyDetails', 'Dim_Listing'], dims):
+        write_staged(df, dim_name, staging_dir=staging_dir)
+
+    summary['periods'] = sorted(summary['periods'])
+    summary['path'] = _fact_dir(staging_dir)
+    rss = peak_rss_mb()
+    print(f"🌊 Streamed {summary['rows']} fact rows in {summary['chunks']} chunks into "
+          f"{len(summary['periods'])} periods" + (f" | peak RSS {rss:.0f} MB" if rss is not None else ""))
+    return dims + (summary,)
@@ -0,0 +1,290 @@
+# Pipeline_Support/WarehouseLoader.py
+import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from sqlalchemy import text
+
+
+COPY_CHUNK_ROWS = 100_000
+LOAD_WORKERS = 4
+STAGE_SUFFIX = '__stage'
+OLD_SUFFIX = '__old'
+HASH_COLUMN = 'row_hash'
+# the swaps themselves run one at a time: dropping a replaced table also drops the foreign keys
+# between fact and dimensions (PhysicalDesign.py), and two such swaps at once could deadlock
+_SWAP_LOCK = threading.Lock()
+
+# Keys and indexes built on each staged star-schema table before it is swapped in. ('primary', cols)
+# falls back to a plain index when the loaded rows repeat a key, so a bad batch does not fail the
+# whole load; 'brin' is a plain index outside Postgres.
+STAR_INDEXES = {
+    'dim_date': [('primary', ['DateID']), ('unique', ['Date'])],
+    'dim_location': [('primary', ['LocationID']), ('unique', ['ZipCode', 'City', 'State'])],
+    'dim_agent': [('primary', ['AgentID']), ('unique', ['Gender', 'AgeCat', 'AgentSince', 'Position'])],
+    'dim_propertydetails': [('primary', ['PropertyDetailsID'])],
+    'dim_listing': [('primary', ['ListingID']), ('unique', ['ListingType', 'NumVisits'])],
+    'fact_transaction': [('primary', ['TransactionID']), ('brin', ['DateID']), ('index', ['LocationID']),
+                         ('index', ['AgentID']), ('index', ['PropertyDetailsID']), ('index', ['ListingID'])],
+}
+
+# Columns mode='merge' matches rows on: the dimensions' natural keys (the attributes their surrogate
+# keys are registered for, see KeyRegistry.py; PropertyDetailsID is the source feature_id) and the
+# facts' TransactionID
+MERGE_KEYS = {
+    'dim_date': ['Date'],
+    'dim_location': ['ZipCode', 'City', 'State'],
+    'dim_agent': ['Gender', 'AgeCat', 'AgentSince', 'Position'],
+    'dim_propertydetails': ['PropertyDetailsID'],
+    'dim_listing': ['ListingType', 'NumVisits'],
+    'fact_transaction': ['TransactionID'],
+    'fact_snapshot': ['TransactionID'],
+}
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class _CsvStream(io.TextIOBase):
+    """File-like CSV view of a frame, rendered one chunk at a time as COPY reads it."""
+
+    def __init__(self, df, chunk_rows=COPY_CHUNK_ROWS):
+        self._chunks = (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+        self._buf = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buf) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buf += chunk.to_csv(index=False, header=False, na_rep='', date_format='%Y-%m-%d %H:%M:%S')
+        if size is None or size < 0:
+            out, self._buf = self._buf, ''
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+    readline = read
+
+
+def copy_rows(conn, df, table):
+    """
+    Append a frame to an existing table on an open connection: COPY FROM STDIN with a streamed CSV
+    buffer on Postgres, batched INSERTs (to_sql) elsewhere.
+    """
+    if conn.dialect.name == 'postgresql':
+        cols = ', '.join(_q(c) for c in df.columns)
+        with conn.connection.cursor() as cur:
+            cur.copy_expert(f'COPY {_q(table)} ({cols}) FROM STDIN WITH (FORMAT csv)', _CsvStream(df))
+    else:
+        df.to_sql(table, conn, if_exists='append', index=False, chunksize=COPY_CHUNK_ROWS)
+
+
+def _create_like(conn, df, table):
+    conn.execute(text(f'DROP TABLE IF EXISTS {_q(table)}'))
+    conn.execute(text(pd.io.sql.get_schema(df.head(0), table, con=conn)))
+
+
+def _index_name(table, kind, cols):
+    return f"{table}_{'_'.join(c.lower() for c in cols)}_{'pkey' if kind == 'primary' else 'idx'}"
+
+
+def _build_indexes(conn, df, target, table, specs, suffix=''):
+    """Create the indexes for `table` on `target` (index names get `suffix`); returns the base names."""
+    names = []
+    postgres = conn.dialect.name == 'postgresql'
+    for kind, cols in specs:
+        cols = [c for c in cols if c in df.columns]
+        if not cols:
+            continue
+        if kind in ('primary', 'unique') and df.duplicated(subset=cols).any():
+            print(f"⚠️ {table}: {', '.join(cols)} repeats in the loaded rows; building a plain index instead")
+            kind = 'index'
+        name = _index_name(table, kind, cols)
+        col_list = ', '.join(_q(c) for c in cols)
+        if kind == 'primary' and postgres:
+            conn.execute(text(f'ALTER TABLE {_q(target)} ADD CONSTRAINT {_q(name + suffix)} PRIMARY KEY ({col_list})'))
+        elif kind in ('primary', 'unique'):
+            conn.execute(text(f'CREATE UNIQUE INDEX {_q(name + suffix)} ON {_q(target)} ({col_list})'))
+        elif kind == 'brin' and postgres:
+            conn.execute(text(f'CREATE INDEX {_q(name + suffix)} ON {_q(target)} USING brin ({col_list})'))
+        else:
+            conn.execute(text(f'CREATE INDEX {_q(name + suffix)} ON {_q(target)} ({col_list})'))
+        names.append(name)
+    return names
+
+
+def _swap(conn, df, stage, table, specs, index_names):
+    """Put the staging table in place of the live one; readers wait only for the renames."""
+    old = table + OLD_SUFFIX
+    sqlite = conn.dialect.name == 'sqlite'
+    if sqlite:
+        # keep views pointing at the table name rather than following the renamed old table
+        conn.exec_driver_sql('PRAGMA legacy_alter_table = ON')
+    conn.execute(text(f'DROP TABLE IF EXISTS {_q(old)}'))
+    if conn.dialect.has_table(conn, table):
+        conn.execute(text(f'ALTER TABLE {_q(table)} RENAME TO {_q(old)}'))
+    conn.execute(text(f'ALTER TABLE {_q(stage)} RENAME TO {_q(table)}'))
+    if sqlite:
+        conn.exec_driver_sql('PRAGMA legacy_alter_table = OFF')
+    # views on the old table go with it; PhysicalDesign recreates its views after the load
+    conn.execute(text(f'DROP TABLE IF EXISTS {_q(old)}' + (' CASCADE' if conn.dialect.name == 'postgresql' else '')))
+    if conn.dialect.name == 'postgresql':
+        for name in index_names:
+            conn.execute(text(f'ALTER INDEX {_q(name + STAGE_SUFFIX)} RENAME TO {_q(name)}'))
+    else:
+        # no ALTER INDEX ... RENAME here: build them under their final names (one writer holds the lock anyway)
+        _build_indexes(conn, df, table, table, specs)
+
+
+def _canonical(s):
+    # the hash depends on the dtype: a Date built as datetime64[us] and read back as [ns], or a
+    # count that is int64 in one run and float64 (with NaN) in the next, must hash the same
+    if pd.api.types.is_datetime64_any_dtype(s):
+        if getattr(s.dt, 'tz', None) is not None:
+            s = s.dt.tz_convert('UTC').dt.tz_localize(None)
+        return s.astype('datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return s.astype('float64')
+    return s
+
+
+def row_hashes(df):
+    """
+    Content hash of every row as int64; the same values give the same hash in every run, whatever
+    the column widths (dates are hashed as datetime64[ns], numbers as float64).
+    """
+    canonical = pd.DataFrame({c: _canonical(df[c]) for c in df.columns}, index=df.index)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy().view('int64')
+
+
+def _key_values(values, like):
+    # keys read back from the warehouse come with the driver's types (dates as text on SQLite)
+    if pd.api.types.is_datetime64_any_dtype(like):
+        return pd.to_datetime(values).astype('datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(like) and not pd.api.types.is_bool_dtype(like):
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    return values.astype(str)
+
+
+def _merge(conn, df, table, keys, specs):
+    """Upsert df into table on keys; returns the (inserted, updated, unchanged) counts."""
+    if df.duplicated(subset=keys).any():
+        print(f"⚠️ {table}: {', '.join(keys)} repeats in the loaded rows; keeping the last of each")
+        df = df.drop_duplicates(subset=keys, keep='last')
+    df = df.assign(**{HASH_COLUMN: row_hashes(df)})
+
+    if not conn.dialect.has_table(conn, table):
+        _create_like(conn, df, table)
+        copy_rows(conn, df, table)
+        _build_indexes(conn, df, table, table, specs)
+        return len(df), 0, 0
+
+    live_cols = {c['name'] for c in conn.dialect.get_columns(conn, table)}
+    if HASH_COLUMN not in live_cols:
+        # first merge into a table loaded by mode='replace': every existing row counts as updated once
+        conn.execute(text(f'ALTER TABLE {_q(table)} ADD COLUMN {_q(HASH_COLUMN)} BIGINT'))
+    kind = 'primary' if ('primary', keys) in specs else 'unique'
+    key_list = ', '.join(_q(c) for c in keys)
+    conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS {_q(_index_name(table, kind, keys))} ON {_q(table)} ({key_list})'))
+
+    # only keys and hashes come back over the wire; unchanged rows are never sent
+    live = pd.read_sql(text(f'SELECT {key_list}, {_q(HASH_COLUMN)} FROM {_q(table)}'), conn)
+    probe = pd.DataFrame({c: _key_values(df[c], df[c]) for c in keys})
+    known = pd.DataFrame({c: _key_values(live[c], df[c]) for c in keys})
+    known['_live_hash'] = live[HASH_COLUMN].to_numpy()
+    matched = probe.merge(known, on=keys, how='left', indicator=True)
+    is_new = (matched['_merge'] == 'left_only').to_numpy()
+    same = ~is_new & (matched['_live_hash'].to_numpy() == df[HASH_COLUMN].to_numpy())
+    inserted, unchanged = int(is_new.sum()), int(same.sum())
+
+    changed = df[~same]
+    if len(changed):
+        stage = table + STAGE_SUFFIX
+        _create_like(conn, changed, stage)
+        copy_rows(conn, changed, stage)
+        cols = ', '.join(_q(c) for c in changed.columns)
+        updates = ', '.join(f'{_q(c)} = excluded.{_q(c)}' for c in changed.columns if c not in keys)
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+        conn.execute(text(f'INSERT INTO {_q(table)} ({cols}) SELECT {cols} FROM {_q(stage)} WHERE true '
+                          f'ON CONFLICT ({key_list}) DO UPDATE SET {updates}'))
+        conn.execute(text(f'DROP TABLE {_q(stage)}'))
+    return inserted, len(df) - inserted - unchanged, unchanged
+
+
+def load_table(df, table, engine, mode='replace', indexes=None, keys=None):
+    """
+    Bulk-load one frame. mode='replace' copies it into <table>__stage, builds its indexes
+    (indexes, default STAR_INDEXES[table]) and swaps it in with two renames in one transaction, so
+    the live table is never missing or half loaded; mode='append' copies straight into the live table.
+    mode='merge' upserts on keys (default MERGE_KEYS[table]) with INSERT ... ON CONFLICT DO UPDATE:
+    each row carries a row_hash of its content, rows whose hash matches the live row are skipped and
+    only new or changed rows are copied, so the load is proportional to the change.
+    Returns {'rows', 'seconds', 'swap_seconds'}, plus 'inserted', 'updated' and 'unchanged' for merges.
+    """
+    start = time.perf_counter()
+    swap_seconds = 0.0
+    specs = STAR_INDEXES.get(table, []) if indexes is None else indexes
+    counts = {}
+    if mode == 'merge':
+        keys = keys or MERGE_KEYS.get(table)
+        if not keys:
+            raise ValueError(f"No merge keys for '{table}'; pass keys=[...]")
+        with engine.begin() as conn:
+            counts = dict(zip(('inserted', 'updated', 'unchanged'), _merge(conn, df, table, list(keys), specs)))
+    elif mode == 'append':
+        with engine.begin() as conn:
+            if not engine.dialect.has_table(conn, table):
+                _create_like(conn, df, table)
+            copy_rows(conn, df, table)
+    elif mode == 'replace':
+        brin = [cols for kind, cols in specs if kind == 'brin' and set(cols) <= set(df.columns)]
+        if brin and engine.dialect.name == 'postgresql':
+            # a BRIN index only prunes block ranges when the rows are stored in key order
+            df = df.sort_values(brin[0], kind='stable')
+        stage = table + STAGE_SUFFIX
+        with engine.begin() as conn:
+            _create_like(conn, df, stage)
+            copy_rows(conn, df, stage)
+            names = []
+            if engine.dialect.name == 'postgresql':
+                names = _build_indexes(conn, df, stage, table, specs, suffix=STAGE_SUFFIX)
+        with _SWAP_LOCK, engine.begin() as conn:
+            swap_start = time.perf_counter()
+            _swap(conn, df, stage, table, specs, names)
+        swap_seconds = time.perf_counter() - swap_start
+    else:
+        raise ValueError("mode must be 'replace', 'append' or 'merge'")
+    return {'rows': len(df), 'seconds': time.perf_counter() - start, 'swap_seconds': swap_seconds, **counts}
+
+
+def load_tables(frames, engine, mode='replace', indexes=None, max_workers=LOAD_WORKERS):
+    """
+    load_table for {table: frame}, independent tables in parallel over the engine's connection pool
+    (one at a time on SQLite, which has a single writer). mode may be a {table: mode} dict;
+    indexes overrides STAR_INDEXES per table. Returns {table: load_table stats}.
+    """
+    modes = mode if isinstance(mode, dict) else {t: mode for t in frames}
+    indexes = indexes or {}
+    workers = 1 if engine.dialect.name == 'sqlite' else max(1, min(max_workers, len(frames)))
+
+    def _one(table):
+        return table, load_table(frames[table], table, engine, modes.get(table, 'replace'), indexes.get(table))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stats = dict(pool.map(_one, list(frames)))
+    for table, s in stats.items():
+        table_mode = modes.get(table, 'replace')
+        if table_mode == 'merge':
+            detail = f" ({s['inserted']} inserted, {s['updated']} updated, {s['unchanged']} unchanged)"
+        elif table_mode == 'append':
+            detail = " (appended)"
+        else:
+            detail = f" (swap {s['swap_seconds'] * 1000:.0f} ms)"
+        print(f"🚚 {table}: {s['rows']} rows in {s['seconds']:.2f}s" + detail)
+    return stats
@@ -0,0 +1,126 @@
+# Pipeline_Support/Watermarks.py
+import os
+import json
+import pandas as pd
+
+
+BASE_DIR = os.path.dirname(__file__)
+WATERMARK_PATH = os.getenv('DWH_WATERMARK_PATH', os.path.join(os.path.dirname(BASE_DIR), '.state', 'watermarks.json'))
+
+# Transactional tables extracted incrementally and the column that orders their rows.
+# Commission is a lookup for the facts (new sales/rents may reference older commission rows),
+# so like visit it is always extracted in full.
+WATERMARK_COLUMNS = {
+    'sale': {'id': 'sale_id', 'date': 'sale_date'},
+    'rent': {'id': 'rent_id', 'date': 'agreement_date'},
+}
+
+
+def load_watermarks(path=None):
+    """Load the persisted watermark state ({} on the first run)."""
+    p = path or WATERMARK_PATH
+    if not os.path.exists(p):
+        return {}
+    with open(p) as f:
+        return json.load(f)
+
+
+def save_watermarks(state, path=None):
+    """Persist watermark state atomically."""
+    p = path or WATERMARK_PATH
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = p + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp, p)
+
+
+def watermark_column(table, by='id'):
+    return WATERMARK_COLUMNS[table][by]
+
+
+def _as_comparable(series, by):
+    if by == 'date':
+        return pd.to_datetime(series, format='mixed', errors='coerce')
+    return pd.to_numeric(series, errors='coerce')
+
+
+def _as_value(value, by):
+    if by == 'date':
+        return pd.Timestamp(value)
+    return float(value)
+
+
+def _row_ids(df, table):
+    col = watermark_column(table, 'id')
+    return pd.to_numeric(df[col], errors='coerce') if col in df.columns else None
+
+
+def filter_new_rows(df, table, state, by='id'):
+    """
+    Return only the rows of df that are newer than the table's watermark.
+    Date watermarks also keep rows on the watermark's own date whose ids were not loaded yet
+    (rows can still arrive for that date after a run). Tables without a watermark yet (first run)
+    are returned unchanged.
+    """
+    mark = state.get(table)
+    if df is None or df.empty or mark is None or mark.get('by') != by:
+        return df
+    col = mark['column']
+    if col not in df.columns:
+        return df
+    values = _as_comparable(df[col], by)
+    value = _as_value(mark['value'], by)
+    keep = values > value
+    ids = _row_ids(df, table) if by == 'date' else None
+    if ids is not None:
+        keep |= (values == value) & ~ids.isin(mark.get('ids', []))
+    return df[keep].reset_index(drop=True)
+
+
+def since_filters(state, by='id'):
+    """
+    Build {table: (column, value, operator)} for pushing the watermarks down into a SQL extract.
+    Date watermarks use >= (the rows already loaded on that date are dropped by filter_new_rows).
+    """
+    filters = {}
+    for table, mark in state.items():
+        if table in WATERMARK_COLUMNS and mark.get('by') == by:
+            if by == 'date':
+                filters[table] = (mark['column'], _as_value(mark['value'], by).to_pydatetime(), '>=')
+            else:
+                filters[table] = (mark['column'], mark['value'], '>')
+    return filters
+
+
+def advance_watermarks(dataframes, state, by='id'):
+    """
+    Return a new state whose watermarks cover every row in dataframes.
+    Watermarks never move backwards; tables with no new rows keep their previous mark.
+    Date watermarks also record the ids of the rows loaded on the watermark's date.
+    """
+    new_state = dict(state)
+    for table in WATERMARK_COLUMNS:
+        df = dataframes.get(table)
+        col = watermark_column(table, by)
+        if df is None or df.empty or col not in df.columns:
+            continue
+        values = _as_comparable(df[col], by)
+        latest = values.max()
+        if pd.isna(latest):
+            continue
+        previous = state.get(table)
+        if previous is not None and previous.get('by') == by and _as_value(previous['value'], by) > latest:
+            continue
+        same_mark = previous is not None and previous.get('by') == by and _as_value(previous['value'], by) == latest
+        if same_mark and by != 'date':
+            continue
+        value = latest.isoformat() if by == 'date' else float(latest)
+        new_state[table] = {'by': by, 'column': col, 'value': value}
+        ids = _row_ids(df, table) if by == 'date' else None
+        if ids is not None:
+            at_mark = set(ids[values == latest].dropna().tolist())
+            if same_mark:
+                at_mark |= set(previous.get('ids', []))
+            new_state[table]['ids'] = sorted(at_mark)
+    return new_state